@@ -0,0 +1,77 @@
+"""Сравнение декодирования и проверки ответа API на длинной истории.
+
+Запуск: python benchmarks/bench_decoding.py [--sizes 10 1000 10000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoding import DECODER_NAME, decode, validate_response  # noqa: E402
+from homework import (  # noqa: E402
+    HOMEWORK_VERDICTS,
+    check_response,
+    homework_status_message,
+    parse_status
+)
+
+
+def make_body(size):
+    """Собери тело ответа API с size работами."""
+    homeworks = [
+        {
+            'id': number,
+            'status': random.choice(list(HOMEWORK_VERDICTS)),
+            'homework_name': f'student__hw{number}.zip',
+            'reviewer_comment': 'Комментарий ревьюера' * 5,
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': f'Урок {number}',
+        }
+        for number in range(size)
+    ]
+    return json.dumps(
+        {'homeworks': homeworks, 'current_date': 1581604970}
+    ).encode()
+
+
+def current_path(body):
+    """Обработай ответ как get_api_answer, check_response и parse_status."""
+    for homework in check_response(json.loads(body)):
+        parse_status(homework)
+
+
+def fast_path(body):
+    """Обработай ответ быстрым декодером и проверкой за один проход."""
+    for homework in validate_response(decode(body)):
+        homework_status_message.format(
+            name=homework['homework_name'],
+            verdict=HOMEWORK_VERDICTS[homework['status']]
+        )
+
+
+def main():
+    """Выведи время обработки одного ответа в миллисекундах."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10, 1000, 10000]
+    )
+    options = parser.parse_args()
+    print(f'декодер: {DECODER_NAME}')
+    print(f'{"homeworks":>10} {"current, ms":>12} {"fast, ms":>10}')
+    for size in options.sizes:
+        body = make_body(size)
+        number = max(1, 10000 // size)
+        current = timeit.timeit(lambda: current_path(body), number=number)
+        fast = timeit.timeit(lambda: fast_path(body), number=number)
+        print(
+            f'{size:>10} {current / number * 1e3:>12.3f} '
+            f'{fast / number * 1e3:>10.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Замер полного цикла опроса на локальных заменителях API.
+
+Цикл: запрос к API Практикума, проверка ответа, разбор статусов,
+отправка сообщения в Telegram. Для каждого числа подписок выводятся
+опросы и сообщения в секунду, p50/p99 времени опроса и память на
+подписку. Заменители работают в том же процессе и делят с ботом
+GIL, поэтому пропускная способность здесь — оценка снизу.
+
+Запуск: python benchmarks/bench_poll_cycle.py [--tenants 1 100 1000]
+Для 100 тыс. подписок и больше уменьшите число кругов: --cycles 1.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telegram  # noqa: E402
+from telegram.utils.request import Request  # noqa: E402
+
+import homework  # noqa: E402
+from connection_pool import create_session  # noqa: E402
+from fakes import fake_practicum, fake_telegram  # noqa: E402
+from storage import subscription_key  # noqa: E402
+from subscriptions import SubscriptionRegistry  # noqa: E402
+from worker import Poller  # noqa: E402
+
+TELEGRAM_TOKEN = '1234:abcdefg'
+
+
+def percentile(values, share):
+    """Верни перцентиль share (от 0 до 1) списка values."""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100)[int(share * 100) - 1]
+
+
+def build_state(tenants, bot, session):
+    """Создай реестр на tenants подписок и опрашивающий их Poller."""
+    registry = SubscriptionRegistry()
+    for number in range(tenants):
+        registry.add(f'token-{number}', str(number + 1))
+    return registry, Poller(bot, session)
+
+
+def measure_memory(tenants, bot, session):
+    """Верни байты на подписку: реестр, курсоры, кэш статусов."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    registry, poller = build_state(tenants, bot, session)
+    for subscription in registry:
+        key = subscription_key(subscription.token)
+        poller.store.save_cursor(key, 1)
+        poller.cache.remember_status(key, {
+            'id': hash(subscription.token) & 0xffffff,
+            'status': 'reviewing',
+            'date_updated': '2020-02-13T14:40:57Z',
+        })
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(
+        stat.size_diff for stat in after.compare_to(before, 'filename')
+    )
+    return size / tenants
+
+
+def run_cycles(tenants, cycles, concurrency, bot, session):
+    """Опроси все подписки cycles раз, верни длительность и задержки."""
+    registry, poller = build_state(tenants, bot, session)
+    subscriptions = list(registry)
+    latencies = []
+
+    def poll(subscription):
+        started = time.perf_counter()
+        poller.poll(subscription)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(cycles):
+            list(executor.map(poll, subscriptions))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    """Выведи таблицу замеров."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--tenants', type=int, nargs='+',
+                        default=[1, 100, 1000])
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=32)
+    options = parser.parse_args()
+    with fake_practicum() as practicum, fake_telegram() as telegram_api:
+        homework.ENDPOINT = practicum.url
+        session = create_session(pool_maxsize=options.concurrency)
+        bot = telegram.Bot(
+            TELEGRAM_TOKEN, base_url=f'{telegram_api.url}bot',
+            request=Request(con_pool_size=options.concurrency)
+        )
+        print(f'{"tenants":>8} {"polls/s":>9} {"msgs/s":>9} '
+              f'{"p50, ms":>8} {"p99, ms":>8} {"B/tenant":>9}')
+        for tenants in options.tenants:
+            sent_before = telegram_api.requests_count
+            elapsed, latencies = run_cycles(
+                tenants, options.cycles, options.concurrency, bot, session
+            )
+            messages = telegram_api.requests_count - sent_before
+            print(
+                f'{tenants:>8} {len(latencies) / elapsed:>9.0f} '
+                f'{messages / elapsed:>9.0f} '
+                f'{percentile(latencies, 0.5) * 1e3:>8.2f} '
+                f'{percentile(latencies, 0.99) * 1e3:>8.2f} '
+                f'{measure_memory(tenants, bot, session):>9.0f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
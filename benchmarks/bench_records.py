@@ -0,0 +1,98 @@
+"""Замер памяти на одну отслеживаемую домашнюю работу.
+
+Сравниваются словарь работы из ответа API, кортеж строк
+(id, название, статус, date_updated) и HomeworkRecord с теми же
+полями, а также StatusCache целиком: запись на работу плюс история
+отправленных изменений.
+
+Запуск: python benchmarks/bench_records.py [--tenants 1000] [--homeworks 10]
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import StatusCache  # noqa: E402
+from records import HomeworkRecord  # noqa: E402
+from storage import subscription_key  # noqa: E402
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+def api_homeworks(tenants, homeworks):
+    """Верни работы так, как их возвращает декодер ответа API."""
+    body = json.dumps([
+        {
+            'id': tenant * homeworks + number,
+            'homework_name': f'student{tenant}__hw{number:02d}.zip',
+            'status': STATUSES[number % len(STATUSES)],
+            'reviewer_comment': 'Всё нравится',
+            'date_updated': f'2020-02-{number % 28 + 1:02d}T14:40:57Z',
+            'lesson_name': f'Спринт {number}',
+        }
+        for tenant in range(tenants)
+        for number in range(homeworks)
+    ])
+    return body
+
+
+def measure(build):
+    """Верни байты, выделенные build() и удерживаемые результатом."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(
+        stat.size_diff for stat in after.compare_to(before, 'filename')
+    )
+    del result
+    return size
+
+
+def fill_cache(homeworks):
+    """Запомни все работы в кэше, как после отправки уведомлений."""
+    cache = StatusCache(maxsize=len(homeworks) + 1)
+    for homework in homeworks:
+        key = subscription_key(homework['homework_name'].split('__')[0])
+        cache.remember_status(key, homework)
+    return cache
+
+
+def main():
+    """Выведи таблицу замеров."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--homeworks', type=int, default=10)
+    options = parser.parse_args()
+    body = api_homeworks(options.tenants, options.homeworks)
+    total = options.tenants * options.homeworks
+    variants = [
+        ('dict из ответа API', lambda: json.loads(body)),
+        ('кортеж строк', lambda: [
+            (
+                homework['id'], homework['homework_name'],
+                homework['status'], homework['date_updated']
+            )
+            for homework in json.loads(body)
+        ]),
+        ('HomeworkRecord', lambda: [
+            HomeworkRecord.from_homework(homework)
+            for homework in json.loads(body)
+        ]),
+        ('StatusCache', lambda: fill_cache(json.loads(body))),
+    ]
+    print(f'{total} работ: {options.tenants} подписок '
+          f'по {options.homeworks} работ')
+    print(f'{"представление":<20} {"B/работа":>9}')
+    for name, build in variants:
+        print(f'{name:<20} {measure(build) / total:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
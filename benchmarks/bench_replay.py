@@ -0,0 +1,80 @@
+"""Прогон записанного трафика через настоящий цикл опроса.
+
+Запись делает python worker.py --record traffic.jsonl.gz. Здесь
+каждый записанный запрос к API повторяется в записанный момент,
+ускоренный в --speed раз: Poller получает записанный ответ с
+записанной задержкой, проверяет и разбирает его, а сообщения уходят
+через Outbox с настоящими лимитами в заменитель бота. Выводятся
+опросы в секунду, сообщения (в записи и в прогоне), p50/p99 времени
+опроса и опоздание опросов относительно расписания.
+
+Запуск: python benchmarks/bench_replay.py traffic.jsonl.gz [--speed 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outbox import Outbox  # noqa: E402
+from storage import open_store  # noqa: E402
+from subscriptions import SubscriptionRegistry  # noqa: E402
+from traffic import (  # noqa: E402
+    ReplayBot,
+    ReplaySession,
+    load_traffic,
+    replay_traffic
+)
+from worker import Poller  # noqa: E402
+
+
+def percentile(values, share):
+    """Верни перцентиль share (от 0 до 1) списка values."""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100)[int(share * 100) - 1]
+
+
+def main():
+    """Прогони запись и выведи таблицу замеров."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=32)
+    options = parser.parse_args()
+    _, events = load_traffic(options.path)
+    polls = [event for event in events if 'tenant' in event]
+    if not polls:
+        sys.exit(f'В записи {options.path} нет запросов к API.')
+    registry = SubscriptionRegistry()
+    for event in polls:
+        registry.add(event['tenant'], event['tenant'])
+    bot = ReplayBot(events, options.speed)
+    outbox = Outbox(bot)
+    outbox.start()
+    poller = Poller(
+        bot, ReplaySession(events, options.speed), open_store(None),
+        outbox=outbox
+    )
+    elapsed, lags, durations = replay_traffic(
+        events, lambda tenant: poller.poll(registry.get(tenant)),
+        options.speed, options.concurrency
+    )
+    outbox.stop(timeout=10)
+    recorded = sum('chat' in event for event in events)
+    print(f'{"записано, с":>12} {events[-1]["t"]:>9.1f}')
+    print(f'{"прогон, с":>12} {elapsed:>9.1f}')
+    print(f'{"подписок":>12} {len(registry):>9}')
+    print(f'{"опросов/с":>12} {len(durations) / elapsed:>9.0f}')
+    print(f'{"сообщений":>12} {bot.sent:>9} (в записи {recorded})')
+    print(f'{"в очереди":>12} {len(outbox):>9}')
+    print(f'{"p50, мс":>12} {percentile(durations, 0.5) * 1e3:>9.2f}')
+    print(f'{"p99, мс":>12} {percentile(durations, 0.99) * 1e3:>9.2f}')
+    print(f'{"опоздание":>12} {percentile(lags, 0.99) * 1e3:>9.2f} мс p99')
+
+
+if __name__ == '__main__':
+    main()
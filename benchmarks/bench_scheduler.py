@@ -0,0 +1,59 @@
+"""Замер накладных расходов планировщика опроса.
+
+Запуск: python benchmarks/bench_scheduler.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import AdaptiveScheduler  # noqa: E402
+from subscriptions import Subscription  # noqa: E402
+
+
+def measure(size):
+    """Замерь добавление, перепланирование и извлечение size подписок."""
+    scheduler = AdaptiveScheduler(jitter=0.1)
+    subscriptions = [
+        Subscription(f'token-{number}', number) for number in range(size)
+    ]
+    started = time.perf_counter()
+    for subscription in subscriptions:
+        scheduler.add(subscription, random.uniform(0, 600))
+    added = time.perf_counter()
+    for subscription in random.sample(subscriptions, size // 2):
+        scheduler.reschedule(subscription)
+    rescheduled = time.perf_counter()
+    for _ in range(size):
+        scheduler.pop_due()
+    popped = time.perf_counter()
+    return {
+        'add': (added - started) / size,
+        'reschedule': (rescheduled - added) / (size // 2),
+        'pop_due': (popped - rescheduled) / size,
+    }
+
+
+def main():
+    """Выведи время операций планировщика в микросекундах."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000]
+    )
+    options = parser.parse_args()
+    print(f'{"entries":>10} {"add, us":>10} {"resched, us":>12} '
+          f'{"pop, us":>10}')
+    for size in options.sizes:
+        result = measure(size)
+        print(
+            f'{size:>10} {result["add"] * 1e6:>10.2f} '
+            f'{result["reschedule"] * 1e6:>12.2f} '
+            f'{result["pop_due"] * 1e6:>10.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
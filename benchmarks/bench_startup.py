@@ -0,0 +1,81 @@
+"""Время импорта модулей бота по python -X importtime.
+
+Каждый модуль импортируется в отдельном чистом интерпретаторе
+несколько раз; выводится медиана суммарного времени импорта модуля
+и то, какие тяжелые пакеты (Telegram, HTTP, dotenv) загрузились.
+С --budget скрипт завершается с кодом 1, если какой-то модуль
+импортируется дольше бюджета, и годится для проверки в CI.
+
+Запуск: python benchmarks/bench_startup.py [--modules homework worker]
+        [--repeat 5] [--budget 150]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('requests', 'telegram', 'telegram.ext', 'dotenv')
+PROBE = (
+    'import sys, {module}; '
+    'print(",".join(name for name in {heavy!r} if name in sys.modules))'
+)
+
+
+def import_time(module):
+    """Импортируй модуль в новом процессе.
+
+    Верни время импорта в миллисекундах и загруженные тяжелые пакеты.
+    """
+    result = subprocess.run(
+        [
+            sys.executable, '-X', 'importtime', '-c',
+            PROBE.format(module=module, heavy=HEAVY_MODULES)
+        ],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    microseconds = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        if name.strip() == module and not name[1:].startswith(' '):
+            microseconds = int(cumulative)
+    loaded = result.stdout.strip()
+    return microseconds / 1000, loaded.split(',') if loaded else []
+
+
+def main():
+    """Выведи таблицу замеров и проверь бюджет."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--modules', nargs='+',
+        default=['homework', 'worker', 'supervisor', 'commands']
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--budget', type=float, help='допустимое время импорта, мс'
+    )
+    options = parser.parse_args()
+    print(f'{"модуль":<12} {"мс":>8}  тяжелые пакеты')
+    over_budget = []
+    for module in options.modules:
+        timings = []
+        for _ in range(options.repeat):
+            milliseconds, loaded = import_time(module)
+            timings.append(milliseconds)
+        median = statistics.median(timings)
+        print(f'{module:<12} {median:>8.1f}  {", ".join(loaded) or "-"}')
+        if options.budget is not None and median > options.budget:
+            over_budget.append(module)
+    if over_budget:
+        sys.exit(
+            f'Превышен бюджет {options.budget} мс: {", ".join(over_budget)}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Локальные заменители API Практикума и Bot API Telegram для замеров."""
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class FakeServer(ThreadingHTTPServer):
+    """HTTP-сервер в отдельном потоке на свободном локальном порту."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler):
+        """Создай сервер на 127.0.0.1 со случайным портом."""
+        super().__init__(('127.0.0.1', 0), handler)
+        self.lock = threading.Lock()
+        self.requests_count = 0
+        self._thread = threading.Thread(
+            target=self.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        """Верни адрес сервера."""
+        return f'http://127.0.0.1:{self.server_port}/'
+
+    def __enter__(self):
+        """Запусти сервер."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """Останови сервер."""
+        self.shutdown()
+        self.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Обработчик, отвечающий JSON по keep-alive соединению."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def send_json(self, data, status=HTTPStatus.OK):
+        """Отправь JSON-ответ."""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Не пиши журнал запросов."""
+
+
+class PracticumHandler(JSONHandler):
+    """Заменитель API Практикума.
+
+    У каждого токена одна работа; ее статус меняется с каждым
+    запросом, чтобы каждый опрос заканчивался уведомлением.
+    """
+
+    def do_GET(self):
+        """Верни статусы работ токена."""
+        token = self.headers.get('Authorization', '').split()[-1]
+        params = parse_qs(urlparse(self.path).query)
+        with self.server.lock:
+            self.server.requests_count += 1
+            counter = self.server.counters.get(token, 0)
+            self.server.counters[token] = counter + 1
+        self.send_json({
+            'homeworks': [{
+                'id': hash(token) & 0xffffff,
+                'homework_name': f'{token}__hw.zip',
+                'status': STATUSES[counter % len(STATUSES)],
+                'date_updated': f'2020-02-13T14:40:{counter % 60:02d}Z',
+            }],
+            'current_date': int(params.get('from_date', ['0'])[0]) + 1,
+        })
+
+
+class TelegramHandler(JSONHandler):
+    """Заменитель Bot API: принимает sendMessage и возвращает Message."""
+
+    def do_POST(self):
+        """Прими сообщение."""
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        with self.server.lock:
+            self.server.requests_count += 1
+            message_id = self.server.requests_count
+        self.send_json({'ok': True, 'result': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(payload.get('chat_id', 0)), 'type': 'private'},
+            'text': payload.get('text', ''),
+        }})
+
+
+def fake_practicum():
+    """Создай заменитель API Практикума."""
+    server = FakeServer(PracticumHandler)
+    server.counters = {}
+    return server
+
+
+def fake_telegram():
+    """Создай заменитель Bot API Telegram."""
+    return FakeServer(TelegramHandler)
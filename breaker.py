@@ -0,0 +1,75 @@
+import os
+import random
+import threading
+import time
+
+
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_TIMEOUT = float(os.getenv('BREAKER_TIMEOUT', 30))
+BACKOFF_BASE = float(os.getenv('BACKOFF_BASE', 60))
+BACKOFF_MAX = float(os.getenv('BACKOFF_MAX', 6 * 60 * 60))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Верни экспоненциальную задержку попытки attempt со случайным разбросом.
+
+    Задержка растет как base * 2 ** attempt, но не больше cap; случайна
+    вторая половина задержки, чтобы повторы разных клиентов не совпадали.
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Предохранитель для запросов к API.
+
+    closed — запросы идут; после threshold ошибок подряд переходит в open.
+    open — запросы не идут, пока не истечет пауза с экспоненциальным
+    ростом. half-open — пропускается один пробный запрос: успех
+    закрывает предохранитель, ошибка снова открывает его.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, timeout=BREAKER_TIMEOUT,
+                 max_timeout=BACKOFF_MAX, clock=time.monotonic):
+        """Создай закрытый предохранитель."""
+        self.threshold = threshold
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self._failures = 0
+        self._openings = 0
+        self._opened_until = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Проверь, можно ли сейчас сделать запрос."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() >= self._opened_until:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """Учти успешный запрос."""
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._openings = 0
+
+    def record_failure(self):
+        """Учти неудачный запрос."""
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.threshold:
+                self.state = OPEN
+                self._opened_until = self.clock() + backoff_delay(
+                    self._openings, self.timeout, self.max_timeout
+                )
+                self._openings += 1
@@ -0,0 +1,165 @@
+import os
+import sys
+import threading
+from collections import Counter, OrderedDict, deque
+
+from records import HomeworkRecord, parse_timestamp, status_code
+from storage import homework_key
+
+
+STATUS_CACHE_SIZE = int(os.getenv('STATUS_CACHE_SIZE', 100_000))
+HISTORY_SIZE = int(os.getenv('HISTORY_SIZE', 10))
+
+
+class StatusCache:
+    """Кэш отправленных уведомлений для подавления повторов.
+
+    Хранит последний статус и date_updated каждой работы в виде
+    компактной HomeworkRecord и последнюю ошибку каждой подписки.
+    При переполнении вытесняются давно не использованные записи (LRU).
+    Промах по статусу проверяется в хранилище, если оно передано.
+
+    Для ответов на команды кэш также хранит последние увиденные
+    статусы работ подписки и историю отправленных изменений.
+
+    Статусы из сообщений, которые стоят в очереди на отправку, отмечены
+    как отправляемые: пока их отправка не закончилась, они не считаются
+    новыми, и следующий опрос не кладет их в очередь второй раз.
+    """
+
+    def __init__(self, maxsize=STATUS_CACHE_SIZE, store=None):
+        """Создай пустой кэш не больше maxsize записей."""
+        self.maxsize = maxsize
+        self.store = store
+        self._statuses = OrderedDict()
+        self._errors = OrderedDict()
+        self._current = OrderedDict()
+        self._history = OrderedDict()
+        self._sending = Counter()
+        self._lock = threading.Lock()
+
+    def _put(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def _get_status(self, key, homework):
+        entry_key = (key, homework_key(homework))
+        with self._lock:
+            if entry_key in self._statuses:
+                self._statuses.move_to_end(entry_key)
+                return self._statuses[entry_key]
+        if self.store is None:
+            return None
+        status = self.store.load_statuses(key).get(entry_key[1])
+        if status is None:
+            return None
+        return HomeworkRecord(
+            homework.get('id'), None, status_code(status),
+            parse_timestamp(homework.get('date_updated'))
+        )
+
+    @staticmethod
+    def _state(key, homework):
+        record = HomeworkRecord.from_homework(homework)
+        return key, homework_key(homework), record.status_code, record.updated
+
+    def start_sending(self, key, homeworks):
+        """Отметь статусы работ, сообщение о которых ушло в очередь."""
+        with self._lock:
+            for homework in homeworks:
+                self._sending[self._state(key, homework)] += 1
+
+    def finish_sending(self, key, homeworks):
+        """Сними отметку об отправке, когда отправка закончилась."""
+        with self._lock:
+            for homework in homeworks:
+                state = self._state(key, homework)
+                self._sending[state] -= 1
+                if self._sending[state] <= 0:
+                    del self._sending[state]
+
+    def is_new_status(self, key, homework):
+        """Проверь, изменились ли статус или date_updated работы.
+
+        Статус, который сейчас отправляется, новым не считается.
+        """
+        with self._lock:
+            if self._state(key, homework) in self._sending:
+                return False
+        known = self._get_status(key, homework)
+        return known is None or not known.same_state(
+            HomeworkRecord.from_homework(homework)
+        )
+
+    def remember_status(self, key, homework):
+        """Запомни отправленный статус работы."""
+        key = sys.intern(key)
+        record = HomeworkRecord.from_homework(homework)
+        with self._lock:
+            self._put(self._statuses, (key, homework_key(homework)), record)
+            history = self._history.get(key)
+            if history is None:
+                history = deque(maxlen=HISTORY_SIZE)
+            history.append(record)
+            self._put(self._history, key, history)
+        if self.store is not None:
+            self.store.save_status(key, homework_key(homework), record.status)
+
+    def observe(self, key, homeworks):
+        """Запомни статусы работ из ответа API, даже если они не новые."""
+        key = sys.intern(key)
+        with self._lock:
+            current = dict(self._current.get(key, {}))
+            for homework in homeworks:
+                record = HomeworkRecord.from_homework(homework)
+                current[record.name] = record
+            self._put(self._current, key, current)
+
+    def current(self, key):
+        """Верни {название работы: HomeworkRecord} из последних ответов API."""
+        with self._lock:
+            return dict(self._current.get(key, {}))
+
+    def history(self, key):
+        """Верни HomeworkRecord отправленных изменений, старые первыми."""
+        with self._lock:
+            return list(self._history.get(key, ()))
+
+    def is_new_error(self, key, message):
+        """Проверь, отличается ли ошибка от последней отправленной."""
+        with self._lock:
+            return self._errors.get(key) != message
+
+    def remember_error(self, key, message):
+        """Запомни отправленное сообщение об ошибке."""
+        with self._lock:
+            self._put(self._errors, key, message)
+
+    def forget_error(self, key):
+        """Сбрось последнюю ошибку подписки после успешного опроса."""
+        with self._lock:
+            self._errors.pop(key, None)
+
+    def forget_subscriptions(self, keys):
+        """Забудь статусы и ошибки подписок keys.
+
+        Нужно, когда подписку опрашивал другой узел и кэш устарел.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        with self._lock:
+            for entry_key in [
+                entry_key for entry_key in self._statuses
+                if entry_key[0] in keys
+            ]:
+                del self._statuses[entry_key]
+            for key in keys:
+                self._errors.pop(key, None)
+                self._current.pop(key, None)
+
+    def __len__(self):
+        """Верни число закэшированных статусов."""
+        return len(self._statuses)
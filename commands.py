@@ -0,0 +1,221 @@
+import logging
+import os
+import queue
+import time
+
+from homework import HOMEWORK_VERDICTS
+from storage import subscription_key
+from subscriptions import SUBSCRIPTIONS_FILE, save_subscriptions
+
+
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', 8443)))
+REFRESH_INTERVAL = float(os.getenv('REFRESH_INTERVAL', 60))
+ADMIN_CHAT_ID = os.getenv('ADMIN_CHAT_ID')
+COMMANDS_PERIOD = 1
+
+logger = logging.getLogger('commands')
+
+NO_SUBSCRIPTION = (
+    'Этот чат ни на что не подписан. Отправьте /subscribe <токен Практикума>.'
+)
+NO_STATUSES = (
+    'С момента запуска бот еще не получал статусов ваших работ. '
+    'Отправьте /refresh, чтобы запросить их.'
+)
+STATUS_LINE = '"{name}": {verdict}'
+SUBSCRIBE_USAGE = 'Отправьте /subscribe <токен Практикума>.'
+
+
+def format_record(record):
+    """Верни строку с названием работы и вердиктом по ее статусу."""
+    return STATUS_LINE.format(
+        name=record.name,
+        verdict=HOMEWORK_VERDICTS.get(record.status, record.status)
+    )
+
+
+class BotCommands:
+    """Ответы на команды /status, /history, /subscribe и /refresh.
+
+    /status и /history отвечают из кэша статусов и не обращаются к API.
+    /refresh и /subscribe только ставят запрос в очередь: его выполняет
+    поток опроса в apply(), и повторные запросы одного токена сливаются
+    в один запрос к API не чаще раза в refresh_interval секунд.
+    """
+
+    def __init__(self, registry, cache, subscriptions_file=SUBSCRIPTIONS_FILE,
+                 refresh_interval=REFRESH_INTERVAL, clock=time.monotonic,
+                 profiler=None, admin_chat_id=ADMIN_CHAT_ID):
+        """Запомни реестр подписок и кэш статусов.
+
+        /profile принимается только из чата admin_chat_id.
+        """
+        self.registry = registry
+        self.cache = cache
+        self.profiler = profiler
+        self.admin_chat_id = admin_chat_id
+        self.subscriptions_file = subscriptions_file
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self._requests = queue.SimpleQueue()
+        self._refreshed = {}
+
+    def _reply(self, update, text):
+        update.effective_message.reply_text(text)
+
+    def status(self, update, context):
+        """Пришли последние известные статусы работ чата."""
+        subscriptions = self.registry.for_chat(update.effective_chat.id)
+        if not subscriptions:
+            self._reply(update, NO_SUBSCRIPTION)
+            return
+        lines = []
+        for subscription in subscriptions:
+            current = self.cache.current(
+                subscription_key(subscription.token)
+            )
+            for record in sorted(
+                current.values(), key=lambda record: record.updated
+            ):
+                lines.append(format_record(record))
+        self._reply(update, '\n'.join(lines) or NO_STATUSES)
+
+    def history(self, update, context):
+        """Пришли последние отправленные в чат изменения статусов."""
+        subscriptions = self.registry.for_chat(update.effective_chat.id)
+        if not subscriptions:
+            self._reply(update, NO_SUBSCRIPTION)
+            return
+        lines = []
+        for subscription in subscriptions:
+            for record in self.cache.history(
+                subscription_key(subscription.token)
+            ):
+                lines.append(
+                    f'{record.date_updated}: {format_record(record)}'
+                )
+        self._reply(update, '\n'.join(lines) or NO_STATUSES)
+
+    def refresh(self, update, context):
+        """Поставь в очередь запрос статусов подписок чата к API."""
+        subscriptions = self.registry.for_chat(update.effective_chat.id)
+        if not subscriptions:
+            self._reply(update, NO_SUBSCRIPTION)
+            return
+        for subscription in subscriptions:
+            self._requests.put(('refresh', subscription.token, None))
+        self._reply(
+            update,
+            'Запрошу статусы у Практикума. Если они изменились, пришлю '
+            'сообщение; текущие статусы — /status.'
+        )
+
+    def subscribe(self, update, context):
+        """Подпиши чат на статусы работ по токену Практикума."""
+        if len(context.args) != 1:
+            self._reply(update, SUBSCRIBE_USAGE)
+            return
+        try:
+            update.effective_message.delete()
+        except Exception as error:
+            logger.warning('Не удалось удалить сообщение с токеном: %s', error)
+            deleted = (
+                'Не удалось удалить сообщение с токеном, удалите его сами.'
+            )
+        else:
+            deleted = 'Сообщение с токеном удалено.'
+        self._requests.put(
+            ('subscribe', context.args[0], update.effective_chat.id)
+        )
+        self._reply(
+            update,
+            f'Подписка оформлена, статусы работ придут в этот чат. {deleted}'
+        )
+
+    def profile(self, update, context):
+        """Начни профилирование воркера или закончи идущее."""
+        if self.profiler is None or not self.admin_chat_id or (
+            str(update.effective_chat.id) != str(self.admin_chat_id)
+        ):
+            return
+        if self.profiler.running:
+            self.profiler.stop()
+            self._reply(
+                update,
+                f'Профилирование остановлено, результат в '
+                f'{self.profiler.path}.'
+            )
+            return
+        path = self.profiler.start()
+        self._reply(
+            update,
+            f'Профилирую {self.profiler.window:.0f} с, результат будет '
+            f'в {path}, время этапов — в журнале.'
+        )
+
+    def handlers(self):
+        """Верни обработчики команд для Dispatcher."""
+        from telegram.ext import CommandHandler
+
+        return [
+            CommandHandler('status', self.status),
+            CommandHandler('history', self.history),
+            CommandHandler('refresh', self.refresh),
+            CommandHandler('subscribe', self.subscribe),
+            CommandHandler('profile', self.profile),
+        ]
+
+    def apply(self, scheduler, poller):
+        """Выполни накопленные запросы в потоке опроса.
+
+        Подписка, которую обновляли меньше refresh_interval секунд
+        назад, повторно не запрашивается. Запрос обновления сбрасывает
+        курсор подписки, чтобы API вернул все ее работы.
+        """
+        pending = {}
+        added = False
+        while True:
+            try:
+                action, token, chat_id = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if action == 'subscribe':
+                subscription = self.registry.add(token, chat_id)
+                poller.restore_checkpoints([subscription])
+                added = True
+            pending[token] = self.registry.get(token)
+        now = self.clock()
+        for token, subscription in pending.items():
+            last = self._refreshed.get(token)
+            if subscription is None or (
+                last is not None and now - last < self.refresh_interval
+            ):
+                continue
+            self._refreshed[token] = now
+            subscription.from_date = 0
+            subscription.fingerprint = None
+            scheduler.add(subscription)
+        if added and self.subscriptions_file:
+            save_subscriptions(self.registry, self.subscriptions_file)
+
+
+def start_commands(commands, token, webhook_url=WEBHOOK_URL):
+    """Запусти прием команд через webhook или long polling.
+
+    Верни Updater, чтобы его можно было остановить.
+    """
+    from telegram.ext import Updater
+
+    updater = Updater(token=token, use_context=True)
+    for handler in commands.handlers():
+        updater.dispatcher.add_handler(handler)
+    if webhook_url:
+        updater.start_webhook(
+            listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, url_path=token,
+            webhook_url=f'{webhook_url.rstrip("/")}/{token}'
+        )
+    else:
+        updater.start_polling()
+    return updater
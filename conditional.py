@@ -0,0 +1,55 @@
+import hashlib
+import re
+from http import HTTPStatus
+
+
+CURRENT_DATE_PATTERN = re.compile(rb'"current_date"\s*:\s*-?\d+')
+
+
+def body_fingerprint(content):
+    """Верни хеш тела ответа без поля current_date.
+
+    current_date меняется в каждом ответе, поэтому в хеш не входит:
+    одинаковые списки работ дают одинаковый отпечаток.
+    """
+    return hashlib.blake2b(
+        CURRENT_DATE_PATTERN.sub(b'', content), digest_size=16
+    ).digest()
+
+
+def conditional_headers(subscription):
+    """Верни заголовки условного запроса по сохраненным валидаторам."""
+    headers = {}
+    if subscription.etag:
+        headers['If-None-Match'] = subscription.etag
+    if subscription.last_modified:
+        headers['If-Modified-Since'] = subscription.last_modified
+    return headers
+
+
+def forget_validators(subscription):
+    """Забудь валидаторы и отпечаток прошлого ответа подписки.
+
+    Следующий ответ будет декодирован и обработан, даже если он
+    совпадает с прошлым.
+    """
+    subscription.etag = None
+    subscription.last_modified = None
+    subscription.fingerprint = None
+
+
+def is_unchanged(subscription, response):
+    """Проверь, что ответ не отличается от прошлого, и запомни валидаторы.
+
+    Ответ не изменился, если API вернул 304 или отпечаток тела совпал
+    с прошлым. В этом случае тело можно не декодировать.
+    """
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        return True
+    subscription.etag = response.headers.get('ETag')
+    subscription.last_modified = response.headers.get('Last-Modified')
+    fingerprint = body_fingerprint(response.content)
+    if fingerprint == subscription.fingerprint:
+        return True
+    subscription.fingerprint = fingerprint
+    return False
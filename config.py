@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+import signal
+import threading
+
+from decoding import compile_validator
+from exceptions import RequiredVariableEError
+from homework import HOMEWORK_VERDICTS, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID
+from scheduler import IDLE_PERIOD, POLL_INTERVALS, stagger
+from storage import subscription_key
+from subscriptions import SUBSCRIPTIONS_FILE, load_subscriptions
+
+
+CONFIG_FILE = os.getenv('CONFIG_FILE')
+CONFIG_CHECK_PERIOD = float(os.getenv('CONFIG_CHECK_PERIOD', 5))
+DEFAULT_VERDICTS = dict(HOMEWORK_VERDICTS)
+
+logger = logging.getLogger('config')
+
+
+def _period(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(
+            f'Настройка {name} должна быть числом секунд. '
+            f'Получен {type(value)}'
+        )
+    if value <= 0:
+        raise ValueError(f'Настройка {name} должна быть больше нуля.')
+    return value
+
+
+def _mapping(value, name):
+    if not isinstance(value, dict):
+        raise TypeError(
+            f'Настройка {name} должна быть словарем. Получен {type(value)}'
+        )
+    return value
+
+
+def _verdicts(value):
+    verdicts = _mapping(value, 'verdicts')
+    if not all(isinstance(verdict, str) for verdict in verdicts.values()):
+        raise TypeError('Вердикты в verdicts должны быть строками.')
+    return verdicts
+
+
+def _tenants(value):
+    tenants = {}
+    for key, tenant in _mapping(value, 'tenants').items():
+        _mapping(tenant, f'tenants.{key}')
+        if set(tenant) - {'interval'}:
+            raise ValueError(
+                f'Для подписки {key} можно задать только interval.'
+            )
+        if 'interval' in tenant:
+            tenants[key] = _period(
+                tenant['interval'], f'tenants.{key}.interval'
+            )
+    return tenants
+
+
+class Config:
+    """Настройки, которые можно менять без перезапуска воркера.
+
+    Значения по умолчанию берутся из окружения, файл CONFIG_FILE
+    переопределяет их. В разделе tenants файла задается интервал
+    опроса отдельных подписок по ключу подписки — тому, что пишется
+    в журнал как tenant, — чтобы не хранить в файле токены.
+    """
+
+    __slots__ = (
+        'practicum_token', 'telegram_chat_id', 'poll_intervals',
+        'idle_period', 'verdicts', 'tenants'
+    )
+
+    def __init__(self, practicum_token=PRACTICUM_TOKEN,
+                 telegram_chat_id=TELEGRAM_CHAT_ID, poll_intervals=None,
+                 idle_period=IDLE_PERIOD, verdicts=None, tenants=None):
+        """Запомни настройки, недостающие возьми по умолчанию."""
+        self.practicum_token = practicum_token
+        self.telegram_chat_id = telegram_chat_id
+        self.poll_intervals = dict(POLL_INTERVALS)
+        self.poll_intervals.update(poll_intervals or {})
+        self.idle_period = idle_period
+        self.verdicts = dict(
+            DEFAULT_VERDICTS if verdicts is None else verdicts
+        )
+        self.tenants = dict(tenants or {})
+
+    @classmethod
+    def from_dict(cls, data, source='настроек'):
+        """Проверь типы настроек из файла и создай по ним Config."""
+        _mapping(data, source)
+        unknown = set(data) - set(cls.__slots__)
+        if unknown:
+            raise ValueError(
+                f'Неизвестные настройки в {source}: {sorted(unknown)}'
+            )
+        options = {}
+        for name in ('practicum_token', 'telegram_chat_id'):
+            if name in data:
+                if not isinstance(data[name], (str, int)):
+                    raise TypeError(
+                        f'Настройка {name} должна быть строкой. '
+                        f'Получен {type(data[name])}'
+                    )
+                options[name] = data[name]
+        if 'idle_period' in data:
+            options['idle_period'] = _period(
+                data['idle_period'], 'idle_period'
+            )
+        if 'poll_intervals' in data:
+            options['poll_intervals'] = {
+                status: _period(interval, f'poll_intervals.{status}')
+                for status, interval in _mapping(
+                    data['poll_intervals'], 'poll_intervals'
+                ).items()
+            }
+        if 'verdicts' in data:
+            options['verdicts'] = _verdicts(data['verdicts'])
+        if 'tenants' in data:
+            options['tenants'] = _tenants(data['tenants'])
+        return cls(**options)
+
+
+def load_config(path=CONFIG_FILE):
+    """Прочитай настройки: окружение, поверх него JSON-файл path."""
+    if not path:
+        return Config()
+    with open(path, encoding='UTF-8') as file:
+        return Config.from_dict(json.load(file), path)
+
+
+def apply_verdicts(verdicts):
+    """Замени вердикты в HOMEWORK_VERDICTS на месте.
+
+    Словарь не пересоздается, поэтому parse_status и команды бота
+    сразу видят новые вердикты.
+    """
+    HOMEWORK_VERDICTS.update(verdicts)
+    for status in set(HOMEWORK_VERDICTS) - set(verdicts):
+        del HOMEWORK_VERDICTS[status]
+
+
+class ConfigReloader:
+    """Перечитывает настройки и подписки работающего воркера.
+
+    Файлы CONFIG_FILE и SUBSCRIPTIONS_FILE перечитываются по SIGHUP
+    или при изменении времени их модификации. Изменения применяются
+    разницей: новые подписки ставятся в расписание, удаленные
+    убираются из него (опрос, который уже идет, доводится до конца,
+    а его сообщения — до отправки), новые интервалы действуют со
+    следующего планирования подписки. Если файл не удалось прочитать,
+    воркер продолжает работать с прежними настройками.
+    """
+
+    def __init__(self, registry, scheduler, poller, config_file=CONFIG_FILE,
+                 subscriptions_file=SUBSCRIPTIONS_FILE):
+        """Запомни работающие реестр подписок, планировщик и опрос."""
+        self.registry = registry
+        self.scheduler = scheduler
+        self.poller = poller
+        self.config_file = config_file
+        self.subscriptions_file = subscriptions_file
+        self.config = None
+        self._tokens = {subscription.token for subscription in registry}
+        self._mtimes = self._stat()
+        self._requested = threading.Event()
+
+    def _stat(self):
+        mtimes = []
+        for path in (self.config_file, self.subscriptions_file):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns if path else None)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def watch_signal(self):
+        """Перечитывай настройки по SIGHUP, где такой сигнал есть."""
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.request)
+
+    def request(self, *args):
+        """Попроси перечитать настройки при следующей проверке.
+
+        Подходит как обработчик SIGHUP: сама перезагрузка выполняется
+        в потоке опроса в check().
+        """
+        self._requested.set()
+
+    def check(self):
+        """Перечитай настройки, если пришел SIGHUP или изменились файлы."""
+        mtimes = self._stat()
+        if mtimes == self._mtimes and not self._requested.is_set():
+            return False
+        self._requested.clear()
+        self._mtimes = mtimes
+        return self.reload()
+
+    def reload(self):
+        """Прочитай настройки и подписки и примени их.
+
+        Верни False, если файлы не прочитаны и остались прежние
+        настройки.
+        """
+        try:
+            config = load_config(self.config_file)
+            desired = load_subscriptions(
+                self.subscriptions_file, config.practicum_token,
+                config.telegram_chat_id
+            )
+        except (
+            RequiredVariableEError, OSError, ValueError, TypeError
+        ) as error:
+            logger.error(
+                'Настройки не перечитаны, остаются прежние: %s', error
+            )
+            return False
+        self.apply(config, desired)
+        return True
+
+    def apply(self, config, desired):
+        """Примени настройки и разницу подписок desired с реестром.
+
+        Удаляются только подписки, которые пришли из файлов или
+        окружения раньше; подписки, добавленные командой /subscribe
+        без SUBSCRIPTIONS_FILE, остаются.
+        """
+        if self.config is None or config.verdicts != self.config.verdicts:
+            apply_verdicts(config.verdicts)
+            self.poller.validate = compile_validator(config.verdicts)
+        self.scheduler.intervals = config.poll_intervals
+        self.scheduler.idle_period = config.idle_period
+        tokens = {subscription.token for subscription in desired}
+        added = []
+        moved = 0
+        for subscription in desired:
+            current = self.registry.get(subscription.token)
+            if current is None:
+                added.append(
+                    self.registry.add(subscription.token, subscription.chat_id)
+                )
+            elif current.chat_id != subscription.chat_id:
+                self.registry.add(subscription.token, subscription.chat_id)
+                moved += 1
+        removed = [
+            token for token in self._tokens - tokens if token in self.registry
+        ]
+        for token in removed:
+            self.registry.remove(token)
+            self.scheduler.remove(token)
+        self.poller.cache.forget_subscriptions(
+            [subscription_key(token) for token in removed]
+        )
+        self._tokens = tokens
+        for subscription in self.registry:
+            subscription.interval = config.tenants.get(
+                subscription_key(subscription.token)
+            )
+        if added:
+            self.poller.restore_checkpoints(added)
+            stagger(self.scheduler, added, CONFIG_CHECK_PERIOD)
+        self.config = config
+        if added or removed or moved:
+            logger.info(
+                'Подписки перечитаны: добавлено %d, удалено %d, '
+                'сменили чат %d, всего %d.',
+                len(added), len(removed), moved, len(self.registry)
+            )
@@ -0,0 +1,56 @@
+import os
+
+from metrics import POOL_NEW_CONNECTIONS, POOL_REUSED_CONNECTIONS
+
+
+POOL_CONNECTIONS = int(os.getenv('POOL_CONNECTIONS', 10))
+POOL_MAXSIZE = int(os.getenv('POOL_MAXSIZE', 100))
+
+
+def create_session(pool_connections=POOL_CONNECTIONS,
+                   pool_maxsize=POOL_MAXSIZE):
+    """Создай сессию с пулом keep-alive соединений.
+
+    pool_connections — сколько хостов держать в пуле,
+    pool_maxsize — сколько соединений держать с одним хостом.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def pool_stats(session):
+    """Верни число запросов, новых и переиспользованных соединений."""
+    requests_count = 0
+    connections_count = 0
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            connections_count += pool.num_connections
+    return {
+        'requests': requests_count,
+        'new_connections': connections_count,
+        'reused_connections': max(requests_count - connections_count, 0),
+    }
+
+
+def export_pool_stats(session):
+    """Отдавай счетчики соединений сессии метриками пула."""
+    POOL_NEW_CONNECTIONS.set_function(
+        lambda: pool_stats(session)['new_connections']
+    )
+    POOL_REUSED_CONNECTIONS.set_function(
+        lambda: pool_stats(session)['reused_connections']
+    )
@@ -0,0 +1,37 @@
+import os
+
+
+CURSOR_OVERLAP = int(os.getenv('CURSOR_OVERLAP', 60))
+
+
+def request_from_date(cursor, overlap=CURSOR_OVERLAP):
+    """Верни from_date запроса: курсор минус окно перекрытия.
+
+    Окно покрывает расхождение часов и задержку записи статусов
+    на стороне API; работы из окна, статусы которых уже отправлены,
+    отсекаются по id работы в кэше статусов.
+    """
+    if not cursor:
+        return 0
+    return max(int(cursor) - overlap, 0)
+
+
+def advance_cursor(cursor, response):
+    """Верни новый курсор по current_date ответа.
+
+    Курсор не сдвигается назад: ответ с меньшим current_date или без
+    него оставляет прежнее значение.
+    """
+    current_date = response.get('current_date')
+    if not isinstance(current_date, int) or isinstance(current_date, bool):
+        return cursor
+    return max(cursor or 0, current_date)
+
+
+def hold_cursor(cursor, holds):
+    """Верни курсор, не заходящий дальше недоставленных обновлений.
+
+    holds — date_updated работ, сообщения о которых еще не доставлены;
+    пока они не доставлены, следующий запрос должен вернуть эти работы.
+    """
+    return min(cursor or 0, *holds) if holds else cursor
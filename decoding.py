@@ -0,0 +1,95 @@
+import json
+import os
+
+from homework import HOMEWORK_VERDICTS
+
+
+JSON_DECODER = os.getenv('JSON_DECODER')
+
+
+def _orjson_loads():
+    import orjson
+    return orjson.loads
+
+
+def _ujson_loads():
+    import ujson
+    return ujson.loads
+
+
+def _json_loads():
+    return json.loads
+
+
+DECODERS = {
+    'orjson': _orjson_loads,
+    'ujson': _ujson_loads,
+    'json': _json_loads,
+}
+
+
+def get_decoder(name=JSON_DECODER):
+    """Верни имя и функцию декодирования JSON.
+
+    Без имени выбирается самая быстрая из установленных библиотек:
+    orjson, ujson, затем стандартный json.
+    """
+    if name:
+        return name, DECODERS[name]()
+    for candidate, load in DECODERS.items():
+        try:
+            return candidate, load()
+        except ImportError:
+            continue
+
+
+DECODER_NAME, decode = get_decoder()
+
+
+def compile_validator(verdicts=HOMEWORK_VERDICTS):
+    """Верни функцию проверки ответа API за один проход.
+
+    Функция проверяет то же, что check_response и parse_status, и
+    current_date, и возвращает список работ. Все нужное для проверки
+    связано в замыкании заранее.
+    """
+    statuses = frozenset(verdicts)
+    is_instance = isinstance
+
+    def validate_response(response):
+        if not is_instance(response, dict):
+            raise TypeError(
+                f'Неправильный формат ответа. Нужен словарь. '
+                f'Получен {type(response)}'
+            )
+        try:
+            homeworks = response['homeworks']
+            current_date = response['current_date']
+        except KeyError as error:
+            raise KeyError(f'Отсутствует ключ {error}')
+        if not (
+            is_instance(homeworks, list) and is_instance(current_date, int)
+        ):
+            raise TypeError(
+                f'Неправильный формат ответа. Нужны список работ и число '
+                f'current_date. Получены {type(homeworks)} '
+                f'и {type(current_date)}'
+            )
+        for homework in homeworks:
+            if not is_instance(homework, dict):
+                raise TypeError(
+                    f'Неправильный формат работы: {type(homework)}'
+                )
+            if 'homework_name' not in homework:
+                raise KeyError('Отсутствует ключ homework_name')
+            status = homework.get('status')
+            if status not in statuses:
+                raise KeyError(
+                    f'Отсутствует статус домашней работы "{status}"'
+                )
+        return homeworks
+
+    return validate_response
+
+
+validate_response = compile_validator()
@@ -8,3 +8,15 @@ class RequiredVariableEError(Exception):
     """Исключение при отсутствии обязательных токенов."""
 
     pass
+
+
+class AuthorizationError(WrongStatusCodeError):
+    """Исключение для отказа API в доступе (401, 403)."""
+
+    pass
+
+
+class TemporaryAPIError(WrongStatusCodeError):
+    """Исключение для временной недоступности API (429, 5xx)."""
+
+    pass
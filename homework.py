@@ -2,19 +2,40 @@ import logging
 import os
 import sys
 import time
-from logging import FileHandler, StreamHandler
-
-import requests
-import telegram
-from dotenv import load_dotenv
+from http import HTTPStatus
 
 from exceptions import (
+    AuthorizationError,
     RequiredVariableEError,
+    TemporaryAPIError,
     WrongStatusCodeError
 )
+from cache import StatusCache
+from cursor import advance_cursor, request_from_date
+from logs import setup_logging
+from profiler import stages
+from storage import homework_key, open_store, subscription_key
+
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
 
+def load_env_file(path=ENV_FILE):
+    """Загрузи переменные окружения из .env, если такой файл есть.
 
-load_dotenv()
+    Когда .env нет (переменные заданы окружением контейнера или
+    сервиса), python-dotenv не импортируется вовсе.
+    """
+    for candidate in (path, '.env'):
+        if os.path.isfile(candidate):
+            from dotenv import load_dotenv
+            load_dotenv(candidate)
+            return
+
+
+load_env_file()
+
+logger = logging.getLogger('homework')
 
 RETRY_PERIOD = 600
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
@@ -27,6 +48,8 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+AUTHORIZATION_ERROR_CODES = (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN)
+MESSAGE_LIMIT = 4096
 homework_status_message = (
     'Изменился статус проверки работы "{name}". {verdict}'
 )
@@ -51,109 +74,214 @@ def check_tokens():
 
 def send_message(bot, message):
     """Отправть сообщение в Telegram."""
+    return send_message_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_message_to_chat(bot, chat_id, message):
+    """Отправь сообщение в указанный чат Telegram, верни успех отправки."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logging.debug(
-            'Сообщение со статусом домашней работы отправлено'
-        )
+        with stages.time('send_message'):
+            bot.send_message(chat_id, message)
+        logger.debug('Сообщение со статусом домашней работы отправлено')
     except Exception as error:
-        logging.exception(
-            f'Ошибка отправки сообщения со статусом домашней работы.'
-            f'{error}'
+        logger.exception(
+            'Ошибка отправки сообщения со статусом домашней работы. %s', error
         )
+        return False
+    return True
 
 
 def get_api_answer(timestamp):
     """Сделай запрос к API и верни ответ приведенный к данным Python."""
+    return request_homework_statuses(PRACTICUM_TOKEN, timestamp)
+
+
+def request_homework_statuses(token, timestamp, session=None):
+    """Сделай запрос к API с токеном подписки и верни ответ."""
+    response = request_api(token, timestamp, session)
+    with stages.time('response.json'):
+        return response.json()
+
+
+def request_api(token, timestamp, session=None, extra_headers=None):
+    """Сделай запрос к API с токеном подписки, верни объект ответа.
+
+    Ответ 304 на условный запрос (extra_headers с If-None-Match или
+    If-Modified-Since) ошибкой не считается. Токен в текст ошибок не
+    попадает: они пишутся в журнал и отправляются в чат.
+    """
+    import requests
+
+    client = requests if session is None else session
+    headers = {'Authorization': f'OAuth {token}'}
+    if extra_headers:
+        headers.update(extra_headers)
     timestamp = {'from_date': timestamp}
+    request = (
+        f'{ENDPOINT}, headers={extra_headers or {}}, params={timestamp}'
+    )
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=timestamp)
+        with stages.time('get_api_answer'):
+            response = client.get(
+                ENDPOINT, headers=headers, params=timestamp
+            )
     except requests.RequestException as error:
         raise ConnectionError(
-            f'Ошибка при запросе к API с параметрами:'
-            f'{ENDPOINT}, headers={HEADERS}, params={timestamp}: {error}'
-        )
-    if response.status_code != 200:
-        raise WrongStatusCodeError(
-            f'Ошибка при запросе к API с параметрами:'
-            f'{ENDPOINT}, headers={HEADERS}, params={timestamp}'
+            f'Ошибка при запросе к API с параметрами: {request}: {error}'
         )
-    return response.json()
+    if response.status_code in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+        return response
+    message = (
+        f'Ошибка при запросе к API с параметрами: {request}, '
+        f'код ответа {response.status_code}'
+    )
+    if response.status_code in AUTHORIZATION_ERROR_CODES:
+        raise AuthorizationError(message)
+    if (
+        response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        or response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+    ):
+        raise TemporaryAPIError(message)
+    raise WrongStatusCodeError(message)
 
 
 def check_response(response):
     """Проверь ответ API на соответствие документации."""
-    if not isinstance(response, dict):
-        raise TypeError(
-            f'Неправильный формат ответа. Нужен словарь. '
-            f'Получен {type(response)}'
-        )
-    if 'homeworks' not in response:
-        raise KeyError('Отсутствует ключ "homeworks"')
-    homeworks = response['homeworks']
-    if not isinstance(homeworks, list):
-        raise TypeError(
-            f'Неправильный формат ответа. '
-            f'Вместо списка получен {type(homeworks)}')
-    return homeworks
+    with stages.time('check_response'):
+        if not isinstance(response, dict):
+            raise TypeError(
+                f'Неправильный формат ответа. Нужен словарь. '
+                f'Получен {type(response)}'
+            )
+        if 'homeworks' not in response:
+            raise KeyError('Отсутствует ключ "homeworks"')
+        homeworks = response['homeworks']
+        if not isinstance(homeworks, list):
+            raise TypeError(
+                f'Неправильный формат ответа. '
+                f'Вместо списка получен {type(homeworks)}')
+        return homeworks
 
 
 def parse_status(homework):
     """Извлеки статус домашней работы, верни сообщение для отправки."""
-    required_keys = ['homework_name', 'status']
-    for key in required_keys:
-        if key not in homework:
-            raise KeyError(f'Отсутствует ключ {key}')
-    name = homework['homework_name']
-    status = homework['status']
-    if status not in HOMEWORK_VERDICTS:
-        raise KeyError(f'Отсутствует статус домашней работы "{status}"')
-    verdict = HOMEWORK_VERDICTS[status]
-    return homework_status_message.format(name=name, verdict=verdict)
+    with stages.time('parse_status'):
+        required_keys = ['homework_name', 'status']
+        for key in required_keys:
+            if key not in homework:
+                raise KeyError(f'Отсутствует ключ {key}')
+        name = homework['homework_name']
+        status = homework['status']
+        if status not in HOMEWORK_VERDICTS:
+            raise KeyError(
+                f'Отсутствует статус домашней работы "{status}"'
+            )
+        verdict = HOMEWORK_VERDICTS[status]
+        return homework_status_message.format(name=name, verdict=verdict)
+
+
+def pack_messages(updates, lines, limit=MESSAGE_LIMIT):
+    """Склей строки в сообщения не длиннее limit символов.
+
+    Верни список пар (работы, текст) по порядку. Строка длиннее limit
+    обрезается: Telegram не принимает сообщения больше 4096 символов.
+    """
+    batches = []
+    for homework, line in zip(updates, lines):
+        line = line[:limit]
+        if batches and len(batches[-1][1]) + 1 + len(line) <= limit:
+            batch, text = batches[-1]
+            batch.append(homework)
+            batches[-1] = (batch, f'{text}\n{line}')
+        else:
+            batches.append(([homework], line))
+    return batches
+
+
+def collect_updates(homeworks, cache, key):
+    """Верни изменившиеся работы по возрастанию date_updated и сообщения.
+
+    Повторы одной работы (например, из окна перекрытия курсора)
+    сводятся к ее последнему состоянию, а уже отправленные статусы
+    не разбираются. Сообщения обо всех изменениях склеиваются, чтобы
+    отправить их в чат как можно меньшим числом запросов, но не больше
+    MESSAGE_LIMIT символов в сообщении. Верни список пар (работы, текст),
+    пустой, если изменений нет.
+    """
+    latest = {}
+    for homework in homeworks:
+        known = latest.get(homework_key(homework))
+        if known is None or (
+            (known.get('date_updated') or '')
+            < (homework.get('date_updated') or '')
+        ):
+            latest[homework_key(homework)] = homework
+    updates = []
+    messages = []
+    for homework in sorted(
+        latest.values(),
+        key=lambda homework: homework.get('date_updated') or ''
+    ):
+        if cache.is_new_status(key, homework):
+            messages.append(parse_status(homework))
+            updates.append(homework)
+    return pack_messages(updates, messages)
+
+
+def send_updates(bot, homeworks, cache, key):
+    """Отправь в Telegram изменившиеся статусы работ.
+
+    Верни False, если новые статусы есть, но сообщение не отправлено:
+    тогда курсор сдвигать нельзя, иначе эти статусы потеряются.
+    """
+    if not homeworks:
+        logger.debug('Список домашних работ пуст.')
+        return True
+    batches = collect_updates(homeworks, cache, key)
+    if not batches:
+        logger.debug('Статусы домашних работ не изменились.')
+    for updates, message in batches:
+        if not send_message(bot, message):
+            return False
+        for homework in updates:
+            cache.remember_status(key, homework)
+    return True
 
 
 def main():
     """Основная логика работы бота."""
+    import telegram
+
     try:
         check_tokens()
     except RequiredVariableEError as error:
-        logging.critical(error)
+        logger.critical(error)
         sys.exit(error)
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = 0
+    store = open_store()
+    cache = StatusCache(store=store)
+    key = subscription_key(PRACTICUM_TOKEN)
+    cursor = store.load_cursor(key)
     while True:
         try:
-            response = get_api_answer(timestamp)
+            response = get_api_answer(request_from_date(cursor))
             homeworks = check_response(response)
-            if not homeworks:
-                message = 'Список домашних работ пуст.'
-                logging.debug(message)
-                send_message(bot, message)
-            else:
-                homework, *_ = homeworks
-                message = parse_status(homework)
-                send_message(bot, message)
+            delivered = send_updates(bot, homeworks, cache, key)
+            cache.forget_error(key)
         except Exception as error:
             message = f'Сбой в работе программы: {error}'
-            logging.exception(message)
-            send_message(bot, message)
+            logger.exception(message)
+            if cache.is_new_error(key, message):
+                if send_message(bot, message):
+                    cache.remember_error(key, message)
         else:
-            timestamp = {'from_date': response.get('current_date', 0)}
+            if delivered:
+                cursor = advance_cursor(cursor, response)
+                store.save_cursor(key, cursor)
         finally:
             time.sleep(RETRY_PERIOD)
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        format=(
-            '%(asctime)s - %(levelname)s - %(name)s - %(filename)s'
-            ' - %(funcName)s - %(lineno)s - %(message)s'
-        ),
-        level=logging.DEBUG,
-        handlers=[
-            FileHandler(filename=__file__ + '.log', mode='w'),
-            StreamHandler(sys.stdout)
-        ],
-        encoding='UTF-8'
-    )
+    setup_logging(__file__ + '.log')
     main()
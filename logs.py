@@ -0,0 +1,139 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler
+)
+
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+TEXT_FORMAT = (
+    '%(asctime)s - %(levelname)s - %(name)s - %(filename)s'
+    ' - %(funcName)s - %(lineno)s - %(message)s'
+)
+CONTEXT_FIELDS = ('tenant', 'homework')
+
+
+class JSONFormatter(logging.Formatter):
+    """Форматирует запись в одну строку JSON.
+
+    Поля tenant и homework берутся из extra, если они переданы.
+    """
+
+    def format(self, record):
+        """Верни запись в виде JSON."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RecordQueueHandler(QueueHandler):
+    """QueueHandler, который оставляет форматирование потоку записи.
+
+    Стандартный prepare() форматирует запись в потоке, который пишет
+    в журнал, и стирает exc_info, поэтому JSONFormatter не получает
+    исключение. Здесь в сообщение только подставляются аргументы.
+    Исключение остается в exc_info, а для очереди другого процесса
+    переводится в текст exc_text: traceback нельзя передать в pickle.
+    """
+
+    def __init__(self, records):
+        """Запомни очередь и то, живет ли она в этом процессе."""
+        super().__init__(records)
+        self.local = isinstance(records, (queue.Queue, queue.SimpleQueue))
+
+    def prepare(self, record):
+        """Верни копию записи, готовую к передаче через очередь."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not self.local:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+
+class LogListener(QueueListener):
+    """QueueListener, который можно останавливать повторно."""
+
+    def stop(self):
+        """Допиши записи из очереди и останови поток, если он запущен."""
+        if self._thread is not None:
+            super().stop()
+
+
+def parse_levels(levels):
+    """Разбери строку вида 'worker=INFO,outbox=WARNING' в словарь."""
+    result = {}
+    for item in filter(None, levels.split(',')):
+        name, _, level = item.partition('=')
+        result[name.strip()] = level.strip().upper()
+    return result
+
+
+def setup_queue_logging(records, level=LOG_LEVEL, levels=LOG_LEVELS):
+    """Направь все записи в очередь records.
+
+    Так же настраивается логирование дочерних процессов: их записи
+    через multiprocessing.Queue пишет поток родительского процесса.
+    """
+    logging.basicConfig(
+        format='%(message)s', level=level,
+        handlers=[RecordQueueHandler(records)], force=True
+    )
+    for name, subsystem_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+
+
+def setup_logging(filename, level=LOG_LEVEL, levels=LOG_LEVELS,
+                  log_format=LOG_FORMAT, records=None):
+    """Настрой неблокирующее логирование в файл с ротацией и в stdout.
+
+    Записи попадают в очередь records, а в файл и поток их пишет
+    отдельный поток QueueListener. Уровни подсистем задаются строкой
+    levels. Верни запущенный QueueListener.
+    """
+    if log_format == 'json':
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+    handlers = [
+        RotatingFileHandler(
+            filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+            encoding='UTF-8'
+        ),
+        logging.StreamHandler(sys.stdout),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    if records is None:
+        records = queue.SimpleQueue()
+    listener = LogListener(records, *handlers, respect_handler_level=True)
+    setup_queue_logging(records, level, levels)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
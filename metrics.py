@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        f'{name}="{value}"' for name, value in sorted(labels.items())
+    )
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """Общая часть метрик: имя, описание, значения по наборам меток."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, description):
+        """Создай метрику без значений."""
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        """Верни строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.extend(self._render_value(dict(labels), value))
+        return lines
+
+    def _render_value(self, labels, value):
+        return [f'{self.name}{_format_labels(labels)} {value}']
+
+
+class Counter(Metric):
+    """Счетчик, который только растет."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличь счетчик с метками labels."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Верни значение счетчика с метками labels."""
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+
+class Gauge(Metric):
+    """Текущее значение, которое вычисляется при чтении."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, description):
+        """Создай метрику без функции вычисления."""
+        super().__init__(name, description)
+        self._function = None
+
+    def set_function(self, function):
+        """Вычисляй значение вызовом function без аргументов."""
+        self._function = function
+
+    def render(self):
+        """Вычисли значение и верни строки метрики."""
+        if self._function is not None:
+            with self._lock:
+                self._values[()] = self._function()
+        return super().render()
+
+
+class Histogram(Metric):
+    """Гистограмма значений с накопительными корзинами."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        """Создай гистограмму с границами корзин buckets."""
+        super().__init__(name, description)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """Учти значение value с метками labels."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """Замерь время выполнения блока with."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        """Верни число учтенных значений с метками labels."""
+        value = self._values.get(tuple(sorted(labels.items())))
+        return 0 if value is None else value[2]
+
+    def _render_value(self, labels, value):
+        counts, total, count = value
+        lines = [
+            f'{self.name}_bucket{_format_labels(dict(labels, le=bound))} '
+            f'{bucket_count}'
+            for bound, bucket_count in zip(self.buckets, counts)
+        ]
+        lines.extend([
+            f'{self.name}_bucket{_format_labels(dict(labels, le="+Inf"))} '
+            f'{count}',
+            f'{self.name}_sum{_format_labels(labels)} {total}',
+            f'{self.name}_count{_format_labels(labels)} {count}',
+        ])
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Создай пустой набор."""
+        self._metrics = []
+
+    def register(self, metric):
+        """Добавь метрику в набор и верни ее."""
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, description):
+        """Создай и добавь счетчик."""
+        return self.register(Counter(name, description))
+
+    def gauge(self, name, description):
+        """Создай и добавь текущее значение."""
+        return self.register(Gauge(name, description))
+
+    def histogram(self, name, description, buckets=DEFAULT_BUCKETS):
+        """Создай и добавь гистограмму."""
+        return self.register(Histogram(name, description, buckets))
+
+    def render(self):
+        """Верни все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+API_LATENCY = REGISTRY.histogram(
+    'homework_api_request_seconds', 'Время запроса к API Практикума.'
+)
+API_RESPONSES = REGISTRY.counter(
+    'homework_api_responses_total',
+    'Ответы API Практикума по коду ответа или типу ошибки.'
+)
+API_COALESCED = REGISTRY.counter(
+    'homework_api_coalesced_total',
+    'Запросы к API, слитые с уже выполняющимся запросом того же токена.'
+)
+PARSE_FAILURES = REGISTRY.counter(
+    'homework_parse_failures_total', 'Ответы API, не прошедшие проверку.'
+)
+TELEGRAM_LATENCY = REGISTRY.histogram(
+    'homework_telegram_send_seconds', 'Время отправки сообщения в Telegram.'
+)
+TELEGRAM_ERRORS = REGISTRY.counter(
+    'homework_telegram_errors_total', 'Ошибки отправки в Telegram по типу.'
+)
+OUTBOX_DEPTH = REGISTRY.gauge(
+    'homework_outbox_depth', 'Сообщения, ожидающие отправки в Telegram.'
+)
+POOL_NEW_CONNECTIONS = REGISTRY.gauge(
+    'homework_pool_new_connections',
+    'Соединения, открытые пулом сессии API Практикума.'
+)
+POOL_REUSED_CONNECTIONS = REGISTRY.gauge(
+    'homework_pool_reused_connections',
+    'Запросы к API Практикума через уже открытое keep-alive соединение.'
+)
+STAGE_SECONDS = REGISTRY.counter(
+    'homework_stage_seconds_total',
+    'Время этапов обработки ответа API, пока включен их замер.'
+)
+SCHEDULER_LAG = REGISTRY.histogram(
+    'homework_scheduler_lag_seconds',
+    'Опоздание опроса подписки относительно расписания.'
+)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдает метрики по адресу /metrics."""
+
+    registry = REGISTRY
+
+    def do_GET(self):
+        """Верни метрики или 404."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = self.registry.render().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Не пиши журнал запросов к метрикам."""
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Запусти HTTP-сервер метрик в фоновом потоке и верни его."""
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    return server
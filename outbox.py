@@ -0,0 +1,272 @@
+import heapq
+import itertools
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from metrics import TELEGRAM_ERRORS, TELEGRAM_LATENCY
+from profiler import stages
+from ratelimit import TokenBucket
+
+
+TELEGRAM_RATE_LIMIT = float(os.getenv('TELEGRAM_RATE_LIMIT', 25))
+CHAT_RATE_LIMIT = float(os.getenv('CHAT_RATE_LIMIT', 1))
+SEND_RETRIES = int(os.getenv('SEND_RETRIES', 5))
+SEND_BACKOFF = float(os.getenv('SEND_BACKOFF', 1))
+CHAT_BUCKETS_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+def is_permanent(error):
+    """Проверь, что повтор отправки не поможет.
+
+    BadRequest (400: чат не найден, сообщение слишком длинное) и
+    Unauthorized (401, 403: бот заблокирован или удален из чата)
+    не исправятся сами, остальные ошибки считаются временными.
+    """
+    import telegram
+
+    return isinstance(
+        error, (telegram.error.BadRequest, telegram.error.Unauthorized)
+    )
+
+
+class OutgoingMessage:
+    """Сообщение в очереди на отправку."""
+
+    __slots__ = (
+        'chat_id', 'text', 'on_sent', 'on_failed', 'checkpoint', 'attempt',
+        'reserved'
+    )
+
+    def __init__(self, chat_id, text, on_sent=None, on_failed=None,
+                 checkpoint=None):
+        """Запомни чат, текст и что вызвать после отправки или отказа."""
+        self.chat_id = chat_id
+        self.text = text
+        self.on_sent = on_sent
+        self.on_failed = on_failed
+        self.checkpoint = checkpoint
+        self.attempt = 0
+        self.reserved = False
+
+
+class Outbox:
+    """Очередь исходящих сообщений Telegram с учетом лимитов.
+
+    Сообщения отправляет отдельный поток, поэтому put() не блокирует
+    опрос API. Частота ограничена глобально и для каждого чата. Если
+    чат исчерпал лимит, сообщение откладывается, не задерживая другие
+    чаты. На RetryAfter (429) отправка повторяется через retry_after
+    секунд, на сетевые ошибки — с экспоненциальной задержкой.
+    BadRequest (400) и Unauthorized (401, 403) не повторяются.
+
+    Если передано хранилище store, статусы из checkpoint отправленного
+    сообщения сохраняются в нем сразу после отправки, независимо от
+    on_sent: так супервизор сохраняет статусы, даже если процесс,
+    поставивший сообщение, уже завершился.
+    """
+
+    def __init__(self, bot, rate=TELEGRAM_RATE_LIMIT,
+                 chat_rate=CHAT_RATE_LIMIT, retries=SEND_RETRIES,
+                 backoff=SEND_BACKOFF, clock=time.monotonic, store=None):
+        """Создай очередь для бота."""
+        self.bot = bot
+        self.store = store
+        self.chat_rate = chat_rate
+        self.retries = retries
+        self.backoff = backoff
+        self.clock = clock
+        self.bucket = TokenBucket(rate, clock=clock)
+        self._chat_buckets = OrderedDict()
+        self._queue = queue.Queue()
+        self._delayed = []
+        self._counter = itertools.count()
+        self._pending = Counter()
+        self._pending_lock = threading.Lock()
+        self._thread = None
+
+    def put(self, chat_id, text, on_sent=None, on_failed=None,
+            checkpoint=None):
+        """Поставь сообщение в очередь, не дожидаясь отправки.
+
+        on_sent вызывается после отправки, on_failed(permanent) — если
+        сообщение отправить не удалось; permanent истинно, когда повтор
+        не поможет. checkpoint — пара (ключ подписки, [(ключ работы,
+        статус), ...]) для сохранения в store после отправки.
+        """
+        with self._pending_lock:
+            self._pending[chat_id] += 1
+        self._queue.put(
+            OutgoingMessage(chat_id, text, on_sent, on_failed, checkpoint)
+        )
+
+    def has_pending(self, chat_id):
+        """Проверь, есть ли неотправленные сообщения в чат chat_id."""
+        with self._pending_lock:
+            return self._pending[chat_id] > 0
+
+    def _done(self, message):
+        with self._pending_lock:
+            self._pending[message.chat_id] -= 1
+            if self._pending[message.chat_id] <= 0:
+                del self._pending[message.chat_id]
+
+    def _notify(self, message, callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception(
+                'Ошибка обработки результата отправки в чат %s.',
+                message.chat_id
+            )
+
+    def _save_checkpoint(self, message):
+        if self.store is None or message.checkpoint is None:
+            return
+        key, statuses = message.checkpoint
+        try:
+            for homework, status in statuses:
+                self.store.save_status(key, homework, status)
+        except Exception:
+            logger.exception(
+                'Не удалось сохранить статусы, отправленные в чат %s.',
+                message.chat_id
+            )
+
+    def _fail(self, message, permanent=False):
+        try:
+            self._notify(message, message.on_failed, permanent)
+        finally:
+            self._done(message)
+
+    def __len__(self):
+        """Верни число сообщений, ожидающих отправки."""
+        return self._queue.qsize() + len(self._delayed)
+
+    def start(self):
+        """Запусти поток отправки."""
+        self._thread = threading.Thread(
+            target=self.run, name='outbox', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Останови поток отправки после уже поставленных сообщений."""
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        """Отправляй сообщения, пока не получишь сигнал остановки."""
+        while self.process():
+            pass
+
+    def process(self, sleep=time.sleep):
+        """Обработай одно сообщение, верни False по сигналу остановки."""
+        if self._delayed and self._delayed[0][0] <= self.clock():
+            message = heapq.heappop(self._delayed)[-1]
+        else:
+            try:
+                message = self._queue.get(timeout=self._delayed_timeout())
+            except queue.Empty:
+                return True
+            if message is None:
+                return False
+        if not message.reserved:
+            message.reserved = True
+            delay = self._chat_bucket(message.chat_id).reserve()
+            if delay:
+                self._delay(message, delay)
+                return True
+        self.bucket.acquire(sleep)
+        self.deliver(message)
+        return True
+
+    def _delayed_timeout(self):
+        if not self._delayed:
+            return None
+        return max(self._delayed[0][0] - self.clock(), 0)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, clock=self.clock)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > CHAT_BUCKETS_SIZE:
+                self._chat_buckets.popitem(last=False)
+        self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _delay(self, message, delay):
+        heapq.heappush(
+            self._delayed,
+            (self.clock() + delay, next(self._counter), message)
+        )
+
+    def _retry(self, message, delay):
+        message.attempt += 1
+        if message.attempt > self.retries:
+            logger.error(
+                'Сообщение в чат %s не отправлено после %s повторов.',
+                message.chat_id, self.retries
+            )
+            self._fail(message)
+            return
+        message.reserved = False
+        self._delay(message, delay)
+
+    def deliver(self, message):
+        """Отправь сообщение, при временной ошибке отложи повтор."""
+        import telegram
+
+        try:
+            with TELEGRAM_LATENCY.time(), stages.time('send_message'):
+                self.bot.send_message(message.chat_id, message.text)
+        except telegram.error.RetryAfter as error:
+            TELEGRAM_ERRORS.inc(error=type(error).__name__)
+            logger.warning(
+                'Telegram просит подождать %s с.', error.retry_after
+            )
+            self._retry(message, error.retry_after)
+            return
+        except (
+            telegram.error.BadRequest, telegram.error.Unauthorized
+        ) as error:
+            TELEGRAM_ERRORS.inc(error=type(error).__name__)
+            logger.error(
+                'Telegram отклонил сообщение в чат %s: %s',
+                message.chat_id, error
+            )
+            self._fail(message, permanent=True)
+            return
+        except telegram.error.NetworkError as error:
+            TELEGRAM_ERRORS.inc(error=type(error).__name__)
+            delay = self.backoff * 2 ** message.attempt
+            logger.warning(
+                'Ошибка сети при отправке в Telegram: %s. Повтор через %s с.',
+                error, delay
+            )
+            self._retry(message, random.uniform(delay / 2, delay))
+            return
+        except Exception as error:
+            TELEGRAM_ERRORS.inc(error=type(error).__name__)
+            logger.exception(
+                'Ошибка отправки сообщения со статусом домашней работы. %s',
+                error
+            )
+            self._fail(message)
+            return
+        logger.debug('Сообщение со статусом домашней работы отправлено')
+        try:
+            self._save_checkpoint(message)
+            self._notify(message, message.on_sent)
+        finally:
+            self._done(message)
@@ -0,0 +1,198 @@
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from metrics import STAGE_SECONDS
+
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+PROFILE_WINDOW = float(os.getenv('PROFILE_WINDOW', 30))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+STAGE_TIMING = os.getenv('STAGE_TIMING', '') not in ('', '0')
+STAGES = (
+    'get_api_answer', 'response.json', 'check_response', 'parse_status',
+    'send_message'
+)
+
+logger = logging.getLogger('profiler')
+DISABLED = nullcontext()
+
+
+class StageTimer:
+    """Суммарное время этапов обработки ответа API.
+
+    Пока замер выключен, time() возвращает общий пустой контекст и
+    ничего не считает, поэтому на горячем пути не создается ни
+    генератор, ни объект контекста на каждый вызов. Включенный замер
+    копит число вызовов и секунды по этапам и увеличивает метрику
+    homework_stage_seconds_total.
+    """
+
+    def __init__(self, enabled=STAGE_TIMING, clock=time.perf_counter):
+        """Создай замер с нулевыми суммами."""
+        self.enabled = enabled
+        self.clock = clock
+        self._calls = Counter()
+        self._seconds = Counter()
+        self._lock = threading.Lock()
+
+    def time(self, stage):
+        """Верни контекст, добавляющий время блока with к этапу stage."""
+        if not self.enabled:
+            return DISABLED
+        return self._timed(stage)
+
+    @contextmanager
+    def _timed(self, stage):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - started
+            with self._lock:
+                self._calls[stage] += 1
+                self._seconds[stage] += elapsed
+            STAGE_SECONDS.inc(elapsed, stage=stage)
+
+    def snapshot(self):
+        """Верни {этап: (вызовы, секунды)} на текущий момент."""
+        with self._lock:
+            return {
+                stage: (self._calls[stage], self._seconds[stage])
+                for stage in STAGES
+            }
+
+
+stages = StageTimer()
+
+
+def format_stages(before, after):
+    """Верни строку с вызовами и временем этапов между двумя снимками."""
+    parts = []
+    for stage in STAGES:
+        calls = after[stage][0] - before[stage][0]
+        seconds = after[stage][1] - before[stage][1]
+        parts.append(f'{stage}: {calls} вызовов, {seconds:.3f} с')
+    return '; '.join(parts)
+
+
+def collapse_stack(frame):
+    """Верни стек кадра в виде func (file:line);... от корня к вершине."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{code.co_name} ({os.path.basename(code.co_filename)}:'
+            f'{code.co_firstlineno})'
+        )
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Выборочный профилировщик работающего процесса.
+
+    Раз в interval секунд в течение window секунд (или до stop())
+    снимает стеки всех потоков и считает одинаковые стеки. Результат
+    записывается в каталог directory в свернутом формате (строка
+    «стек число»), который читают flamegraph.pl, speedscope и inferno.
+    На время профилирования включается замер этапов stages, а их
+    суммарное время пишется в журнал.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, window=PROFILE_WINDOW,
+                 interval=PROFILE_INTERVAL, timer=None,
+                 frames=sys._current_frames):
+        """Запомни настройки, не начиная профилирования."""
+        self.directory = directory
+        self.window = window
+        self.interval = interval
+        self.timer = stages if timer is None else timer
+        self.frames = frames
+        self.samples = Counter()
+        self.path = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self):
+        """Проверь, идет ли профилирование."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Начни профилирование в фоновом потоке, верни путь результата.
+
+        Если профилирование уже идет, верни None.
+        """
+        if self.running:
+            return None
+        self.samples = Counter()
+        self._stopping.clear()
+        self.path = os.path.join(
+            self.directory,
+            f'profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.folded'
+        )
+        self._thread = threading.Thread(
+            target=self.run, name='profiler', daemon=True
+        )
+        self._thread.start()
+        return self.path
+
+    def sample(self):
+        """Сними стеки всех потоков, кроме потока профилировщика."""
+        names = {
+            thread.ident: thread.name for thread in threading.enumerate()
+        }
+        own = threading.get_ident()
+        for thread_id, frame in self.frames().items():
+            if thread_id == own:
+                continue
+            thread = names.get(thread_id, str(thread_id))
+            self.samples[f'{thread};{collapse_stack(frame)}'] += 1
+
+    def write(self, path):
+        """Запиши выборки в свернутом формате."""
+        with open(path, 'w', encoding='UTF-8') as file:
+            for stack, count in self.samples.most_common():
+                file.write(f'{stack} {count}\n')
+
+    def run(self):
+        """Снимай выборки window секунд, затем запиши результат."""
+        enabled = self.timer.enabled
+        self.timer.enabled = True
+        before = self.timer.snapshot()
+        deadline = time.monotonic() + self.window
+        try:
+            while time.monotonic() < deadline:
+                self.sample()
+                if self._stopping.wait(self.interval):
+                    break
+        finally:
+            self.timer.enabled = enabled
+        self.write(self.path)
+        logger.info(
+            'Профиль записан в %s: %d выборок. Этапы: %s',
+            self.path, sum(self.samples.values()),
+            format_stages(before, self.timer.snapshot())
+        )
+
+    def stop(self):
+        """Закончи профилирование раньше и запиши результат."""
+        self._stopping.set()
+
+    def toggle(self, *args):
+        """Начни профилирование или закончи идущее (обработчик сигнала)."""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def watch_signal(self):
+        """Профилируй по SIGUSR2, где такой сигнал есть."""
+        if hasattr(signal, 'SIGUSR2'):
+            signal.signal(signal.SIGUSR2, self.toggle)
@@ -0,0 +1,50 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Ограничитель частоты «ведро с токенами».
+
+    Токены пополняются со скоростью rate в секунду, но не больше
+    capacity. Каждое действие забирает один токен.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Создай полное ведро."""
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self):
+        """Забери токен в долг, верни сколько секунд подождать до действия."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def try_acquire(self):
+        """Забери токен, если он есть, и верни успех."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def acquire(self, sleep=time.sleep):
+        """Дождись токена."""
+        delay = self.reserve()
+        if delay:
+            sleep(delay)
@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime, timezone
+
+
+STATUSES = ['reviewing', 'rejected', 'approved']
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+_statuses_lock = threading.Lock()
+
+
+def status_code(status):
+    """Верни небольшое целое для строки статуса.
+
+    Известные статусы — ключи HOMEWORK_VERDICTS — получают коды 0–2,
+    новый статус API получает следующий свободный код.
+    """
+    code = STATUS_CODES.get(status)
+    if code is None:
+        with _statuses_lock:
+            code = STATUS_CODES.get(status)
+            if code is None:
+                code = STATUS_CODES[status] = len(STATUSES)
+                STATUSES.append(status)
+    return code
+
+
+def parse_timestamp(value):
+    """Переведи date_updated вида 2020-02-13T14:40:57Z в секунды UNIX.
+
+    Пустая или нераспознанная дата считается нулем.
+    """
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+    return int(moment.timestamp())
+
+
+def format_timestamp(value):
+    """Переведи секунды UNIX обратно в строку вида 2020-02-13T14:40:57Z."""
+    return datetime.fromtimestamp(value, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+class HomeworkRecord:
+    """Компактное состояние домашней работы.
+
+    Вместо словаря из ответа API хранит id, название, код статуса
+    и время обновления в секундах; строки статусов и дат не хранятся.
+    """
+
+    __slots__ = ('id', 'name', 'status_code', 'updated')
+
+    def __init__(self, id, name, status_code, updated):
+        """Запомни поля работы."""
+        self.id = id
+        self.name = name
+        self.status_code = status_code
+        self.updated = updated
+
+    @classmethod
+    def from_homework(cls, homework):
+        """Создай запись из словаря работы из ответа API."""
+        return cls(
+            homework.get('id'),
+            homework.get('homework_name'),
+            status_code(homework.get('status')),
+            parse_timestamp(homework.get('date_updated'))
+        )
+
+    @property
+    def status(self):
+        """Верни строку статуса."""
+        return STATUSES[self.status_code]
+
+    @property
+    def date_updated(self):
+        """Верни время обновления в формате API."""
+        return format_timestamp(self.updated)
+
+    def same_state(self, other):
+        """Проверь, совпадают ли статус и время обновления."""
+        return (
+            self.status_code == other.status_code
+            and self.updated == other.updated
+        )
+
+    def __repr__(self):
+        """Покажи работу с названием и статусом."""
+        return f'HomeworkRecord({self.name!r}, {self.status!r})'
@@ -0,0 +1,260 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from breaker import backoff_delay
+from homework import RETRY_PERIOD
+from metrics import SCHEDULER_LAG
+from ratelimit import TokenBucket
+
+
+REVIEWING_PERIOD = int(os.getenv('REVIEWING_PERIOD', 60))
+IDLE_PERIOD = int(os.getenv('IDLE_PERIOD', RETRY_PERIOD))
+APPROVED_PERIOD = int(os.getenv('APPROVED_PERIOD', RETRY_PERIOD * 3))
+POLL_JITTER = float(os.getenv('POLL_JITTER', 0.1))
+API_RATE_LIMIT = float(os.getenv('API_RATE_LIMIT', 5))
+POLL_INTERVALS = {
+    'reviewing': REVIEWING_PERIOD,
+    'rejected': RETRY_PERIOD,
+    'approved': APPROVED_PERIOD,
+}
+
+
+def stagger(scheduler, subscriptions, period=RETRY_PERIOD):
+    """Поставь подписки в расписание равномерно на протяжении period."""
+    subscriptions = list(subscriptions)
+    step = period / max(len(subscriptions), 1)
+    for index, subscription in enumerate(subscriptions):
+        scheduler.add(subscription, index * step)
+
+
+def subscription_status(homeworks, default=None):
+    """Верни статус подписки для выбора частоты опроса.
+
+    Если хоть одна работа на ревью — reviewing, иначе статус самой
+    свежей работы. Пустой ответ статус не меняет.
+    """
+    if not homeworks:
+        return default
+    statuses = [homework.get('status') for homework in homeworks]
+    if 'reviewing' in statuses:
+        return 'reviewing'
+    latest = max(
+        homeworks, key=lambda homework: homework.get('date_updated') or ''
+    )
+    return latest.get('status', default)
+
+
+class AdaptiveScheduler:
+    """Планировщик опроса подписок с интервалом по их статусу.
+
+    Подписку на ревью опрашивают часто, принятую или без работ — редко.
+    К интервалу добавляется случайный разброс jitter, а общая частота
+    запросов к API ограничена rate запросами в секунду.
+    """
+
+    def __init__(self, rate=API_RATE_LIMIT, jitter=POLL_JITTER,
+                 clock=time.monotonic):
+        """Создай пустой планировщик.
+
+        Интервалы по статусам лежат в intervals и idle_period и могут
+        быть заменены на ходу: новые значения действуют со следующего
+        планирования подписки.
+        """
+        self.intervals = dict(POLL_INTERVALS)
+        self.idle_period = IDLE_PERIOD
+        self.jitter = jitter
+        self.clock = clock
+        self.bucket = TokenBucket(rate, clock=clock)
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+
+    def interval_for(self, status, interval=None):
+        """Верни интервал опроса для статуса с учетом разброса.
+
+        Заданный interval — интервал отдельной подписки — заменяет
+        интервал статуса.
+        """
+        if interval is None:
+            interval = self.intervals.get(status, self.idle_period)
+        spread = interval * self.jitter
+        return interval + random.uniform(-spread, spread)
+
+    def add(self, subscription, delay=0):
+        """Поставь подписку в расписание через delay секунд.
+
+        Если подписка уже в расписании, старая запись помечается
+        удаленной и пропускается при извлечении (ленивое удаление).
+        """
+        self._invalidate(self._entries.get(subscription.token))
+        entry = [self.clock() + delay, next(self._counter), subscription]
+        self._entries[subscription.token] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._compact()
+
+    def remove(self, token):
+        """Убери подписку из расписания."""
+        self._invalidate(self._entries.pop(token, None))
+
+    def next_interval(self, subscription):
+        """Верни интервал до следующего опроса подписки.
+
+        После сбоев подряд интервал растет экспоненциально.
+        """
+        interval = self.interval_for(
+            subscription.status, subscription.interval
+        )
+        if subscription.failures:
+            return max(interval, backoff_delay(subscription.failures))
+        return interval
+
+    def reschedule(self, subscription):
+        """Назначь следующий опрос подписки по ее статусу."""
+        self.add(subscription, self.next_interval(subscription))
+
+    def _invalidate(self, entry):
+        if entry is not None:
+            entry[-1] = None
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if entry[-1] is not None]
+        heapq.heapify(self._heap)
+
+    def pop_due(self):
+        """Извлеки ближайшую подписку, верни ее и секунды до опроса.
+
+        Пока подписка опрашивается, она остается в реестре расписания
+        без времени опроса; remove() в это время исключит ее из
+        дальнейшего опроса.
+        """
+        while self._heap:
+            due, _, subscription = heapq.heappop(self._heap)
+            if subscription is None:
+                continue
+            self._entries[subscription.token] = None
+            return subscription, max(due - self.clock(), 0)
+        return None, None
+
+    def __len__(self):
+        """Верни число подписок в расписании."""
+        return len(self._entries)
+
+    def _put_back(self, subscription, delay):
+        if subscription is None:
+            return
+        token = subscription.token
+        if token in self._entries and self._entries[token] is None:
+            self.add(subscription, delay)
+
+    def _next_due(self):
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _wait_due(self, condition, endless, stopping):
+        while True:
+            if stopping.is_set():
+                return None, None
+            due = self._next_due()
+            if due is None:
+                if not self._entries and not endless:
+                    condition.notify_all()
+                    return None, None
+                condition.wait()
+                continue
+            delay = due - self.clock()
+            if delay > 0:
+                condition.wait(delay)
+                continue
+            return self.pop_due()[0], due
+
+    def _poll_in_pool(self, condition, poll, sleep, endless, stopping):
+        while True:
+            with condition:
+                subscription, due = self._wait_due(
+                    condition, endless, stopping
+                )
+            if subscription is None:
+                return
+            self.bucket.acquire(sleep)
+            SCHEDULER_LAG.observe(max(self.clock() - due, 0))
+            try:
+                poll(subscription)
+            finally:
+                with condition:
+                    self._put_back(
+                        subscription, self.next_interval(subscription)
+                    )
+                    condition.notify_all()
+
+    def _run_pool(self, poll, threads, sleep, tick, period):
+        """Опрашивай подписки в threads потоках.
+
+        Поток берет подписку только когда подходит ее время и
+        возвращает в расписание после опроса, поэтому одну подписку
+        одновременно опрашивает один поток. Расписание меняется под
+        общей блокировкой; tick выполняется под ней же в вызывающем
+        потоке, пока потоки опроса ждут или опрашивают. Если tick
+        выбросит исключение, потоки заканчивают начатые опросы и выходят.
+        """
+        condition = threading.Condition()
+        stopping = threading.Event()
+        workers = [
+            threading.Thread(
+                target=self._poll_in_pool, name=f'poll-{number}', args=(
+                    condition, poll, sleep, tick is not None, stopping
+                ), daemon=True
+            )
+            for number in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while tick is not None:
+                with condition:
+                    tick()
+                    condition.notify_all()
+                sleep(period)
+        finally:
+            stopping.set()
+            with condition:
+                condition.notify_all()
+            for worker in workers:
+                worker.join()
+
+    def run(self, poll, sleep=time.sleep, tick=None, period=None,
+            threads=1):
+        """Опрашивай подписки по расписанию, пока оно не пусто.
+
+        Если передан tick, он вызывается между опросами не реже раза
+        в period секунд, а пустое расписание не завершает цикл.
+        При threads больше 1 опросы идут в пуле из threads потоков.
+        """
+        if threads > 1:
+            self._run_pool(poll, threads, sleep, tick, period)
+            return
+        next_tick = self.clock()
+        while True:
+            if tick is not None and self.clock() >= next_tick:
+                tick()
+                next_tick = self.clock() + period
+            subscription, delay = self.pop_due()
+            if tick is not None and (
+                subscription is None or self.clock() + delay > next_tick
+            ):
+                self._put_back(subscription, delay)
+                sleep(max(next_tick - self.clock(), 0))
+                continue
+            if subscription is None:
+                return
+            due = self.clock() + delay
+            sleep(delay)
+            self.bucket.acquire(sleep)
+            SCHEDULER_LAG.observe(max(self.clock() - due, 0))
+            poll(subscription)
+            self._put_back(subscription, self.next_interval(subscription))
@@ -0,0 +1,235 @@
+import bisect
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from storage import subscription_key
+
+
+SHARD_STORE = os.getenv('SHARD_STORE')
+SHARD_NODE = os.getenv('SHARD_NODE')
+SHARD_REPLICAS = int(os.getenv('SHARD_REPLICAS', 100))
+SHARD_HEARTBEAT = float(os.getenv('SHARD_HEARTBEAT', 5))
+SHARD_TTL = float(os.getenv('SHARD_TTL', 30))
+SQLITE_MAX_VARIABLES = 500
+
+
+def default_node():
+    """Верни имя узла: SHARD_NODE или имя хоста и номер процесса."""
+    return SHARD_NODE or f'{socket.gethostname()}-{os.getpid()}'
+
+
+def ring_position(value):
+    """Верни позицию строки value на кольце хешей."""
+    return int(hashlib.sha256(value.encode()).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Консистентное хеширование ключей подписок по узлам.
+
+    Каждый узел занимает replicas точек на кольце, ключ достается
+    ближайшему по часовой стрелке узлу. При появлении или уходе узла
+    меняют владельца только ключи его участков кольца.
+    """
+
+    def __init__(self, nodes=(), replicas=SHARD_REPLICAS):
+        """Размести узлы nodes на кольце."""
+        self.nodes = tuple(sorted(nodes))
+        points = sorted(
+            (ring_position(f'{node}#{replica}'), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._positions = [position for position, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key):
+        """Верни узел, которому принадлежит ключ подписки key.
+
+        Ключ подписки уже является хешем, поэтому он и задает позицию.
+        """
+        if not self._positions:
+            return None
+        index = bisect.bisect(self._positions, int(key, 16))
+        return self._owners[index % len(self._owners)]
+
+
+def _chunks(keys):
+    keys = list(keys)
+    for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+        yield keys[start:start + SQLITE_MAX_VARIABLES]
+
+
+class LeaseStore:
+    """Живые узлы и аренды подписок в общей базе SQLite.
+
+    Узел отмечается в таблице workers раз в heartbeat и считается живым,
+    пока не истек срок его записи. Подписку опрашивает только узел,
+    который держит ее аренду; чужую аренду можно забрать только после
+    того, как владелец ее отпустил или она истекла.
+
+    Рассчитано на узлы одной машины: сроки считаются по часам clock
+    каждого узла, а взаимное исключение держится на блокировках файла
+    SQLite, которые на сетевых файловых системах ненадежны.
+    """
+
+    def __init__(self, path, clock=time.time):
+        """Открой базу и создай таблицы, если их нет."""
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS workers ('
+                'node TEXT PRIMARY KEY, expires REAL NOT NULL)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                'key TEXT PRIMARY KEY, node TEXT NOT NULL, '
+                'expires REAL NOT NULL)'
+            )
+
+    def heartbeat(self, node, ttl):
+        """Продли запись узла, верни список живых узлов."""
+        now = self.clock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?)',
+                (node, now + ttl)
+            )
+            self._connection.execute(
+                'DELETE FROM workers WHERE expires <= ?', (now,)
+            )
+            rows = self._connection.execute(
+                'SELECT node FROM workers ORDER BY node'
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def held(self, node):
+        """Верни множество ключей, аренды которых держит узел."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT key FROM leases WHERE node = ? AND expires > ?',
+                (node, self.clock())
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def renew(self, node, ttl):
+        """Продли все действующие аренды узла."""
+        now = self.clock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'UPDATE leases SET expires = ? '
+                'WHERE node = ? AND expires > ?',
+                (now + ttl, node, now)
+            )
+
+    def acquire(self, node, keys, ttl):
+        """Возьми аренды свободных или истекших ключей keys."""
+        now = self.clock()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO leases VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'node = excluded.node, expires = excluded.expires '
+                'WHERE leases.node = excluded.node OR leases.expires <= ?',
+                [(key, node, now + ttl, now) for key in keys]
+            )
+
+    def release(self, node, keys):
+        """Отпусти аренды ключей keys, которые держит узел."""
+        with self._lock, self._connection:
+            for chunk in _chunks(keys):
+                self._connection.execute(
+                    'DELETE FROM leases WHERE node = ? AND key IN '
+                    f'({",".join("?" * len(chunk))})',
+                    (node, *chunk)
+                )
+
+    def leave(self, node):
+        """Удали узел и все его аренды."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM leases WHERE node = ?', (node,)
+            )
+            self._connection.execute(
+                'DELETE FROM workers WHERE node = ?', (node,)
+            )
+
+    def close(self):
+        """Закрой соединение с базой."""
+        self._connection.close()
+
+
+class ShardCoordinator:
+    """Распределение подписок между узлами по кольцу хешей и арендам.
+
+    Узел опрашивает подписку, только пока держит ее аренду. При смене
+    состава узлов прежний владелец сначала отпускает аренду, и лишь
+    затем новый ее берет, поэтому подписку никогда не опрашивают два
+    узла сразу; если владелец упал, аренда истекает через ttl секунд.
+    """
+
+    def __init__(self, leases, node=None, ttl=SHARD_TTL,
+                 heartbeat=SHARD_HEARTBEAT, replicas=SHARD_REPLICAS):
+        """Запомни общую базу аренд и параметры узла."""
+        self.leases = leases
+        self.node = default_node() if node is None else node
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.replicas = replicas
+        self.ring = HashRing(replicas=replicas)
+        self._owned = set()
+        self._valid_until = 0
+
+    def owns(self, token):
+        """Проверь, что аренда подписки с токеном token еще действует."""
+        return (
+            token in self._owned
+            and self.leases.clock() < self._valid_until
+        )
+
+    def rebalance(self, registry, busy=None):
+        """Сверь аренды с кольцом, верни взятые подписки и токены отданных.
+
+        Узел отпускает аренды подписок, которые по кольцу принадлежат
+        другим узлам, продлевает свои и пытается взять недостающие.
+        Аренду подписки, для которой busy(subscription) истинно
+        (например, ее сообщение еще не отправлено), узел держит до
+        следующей сверки, но саму подписку уже не опрашивает.
+        """
+        started = self.leases.clock()
+        nodes = self.leases.heartbeat(self.node, self.ttl)
+        if tuple(nodes) != self.ring.nodes:
+            self.ring = HashRing(nodes, self.replicas)
+        subscriptions = {}
+        wanted = {}
+        for subscription in registry:
+            key = subscription_key(subscription.token)
+            subscriptions[key] = subscription
+            if self.ring.node_for(key) == self.node:
+                wanted[key] = subscription
+        self.leases.renew(self.node, self.ttl)
+        held = self.leases.held(self.node)
+        self.leases.release(self.node, [
+            key for key in held - wanted.keys()
+            if busy is None or key not in subscriptions
+            or not busy(subscriptions[key])
+        ])
+        self.leases.acquire(self.node, wanted.keys() - held, self.ttl)
+        held = self.leases.held(self.node) & wanted.keys()
+        self._valid_until = started + self.ttl
+        owned = {wanted[key].token for key in held}
+        acquired = [wanted[key] for key in held
+                    if wanted[key].token not in self._owned]
+        released = list(self._owned - owned)
+        self._owned = owned
+        return acquired, released
+
+    def leave(self):
+        """Отпусти все аренды узла при остановке."""
+        self.leases.leave(self.node)
+        self._owned = set()
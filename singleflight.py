@@ -0,0 +1,61 @@
+import threading
+
+from metrics import API_COALESCED
+
+
+class Call:
+    """Выполняющийся вызов и его результат."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        """Создай незавершенный вызов."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Слияние одновременных вызовов с одинаковым ключом.
+
+    Пока вызов с ключом выполняется, остальные вызовы с тем же ключом
+    не повторяют его, а ждут и получают тот же результат или ту же
+    ошибку. Завершенные результаты не кэшируются.
+    """
+
+    def __init__(self):
+        """Создай пустую таблицу вызовов."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """Выполни function один раз для одновременных вызовов с ключом key.
+
+        Верни пару (результат, shared): shared истинно, если результат
+        получен от чужого вызова.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+        if not leader:
+            API_COALESCED.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = function()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def __len__(self):
+        """Верни число выполняющихся вызовов."""
+        return len(self._calls)
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+
+STATE_STORE = os.getenv('STATE_STORE')
+COMPACT_MIN_RECORDS = int(os.getenv('COMPACT_MIN_RECORDS', 1000))
+
+logger = logging.getLogger(__name__)
+
+
+def subscription_key(token):
+    """Верни ключ подписки, по которому нельзя восстановить токен."""
+    return hashlib.sha256(str(token).encode()).hexdigest()[:16]
+
+
+def homework_key(homework):
+    """Верни ключ домашней работы: id, а если его нет — название."""
+    return str(homework.get('id') or homework.get('homework_name'))
+
+
+class CheckpointStore:
+    """Хранилище курсора current_date и последних отправленных статусов."""
+
+    def load_cursor(self, key):
+        """Верни сохраненный current_date подписки или 0."""
+        raise NotImplementedError
+
+    def save_cursor(self, key, current_date):
+        """Сохрани current_date подписки."""
+        raise NotImplementedError
+
+    def load_statuses(self, key):
+        """Верни словарь {работа: статус} последних отправленных статусов."""
+        raise NotImplementedError
+
+    def save_status(self, key, homework, status):
+        """Сохрани последний отправленный статус работы."""
+        raise NotImplementedError
+
+    def close(self):
+        """Освободи ресурсы хранилища."""
+
+
+class MemoryStore(CheckpointStore):
+    """Хранилище в памяти процесса, теряется при перезапуске."""
+
+    def __init__(self):
+        """Создай пустое хранилище."""
+        self._cursors = {}
+        self._statuses = {}
+
+    def load_cursor(self, key):
+        """Верни сохраненный current_date подписки или 0."""
+        return self._cursors.get(key, 0)
+
+    def save_cursor(self, key, current_date):
+        """Сохрани current_date подписки."""
+        self._cursors[key] = current_date
+
+    def load_statuses(self, key):
+        """Верни словарь {работа: статус} последних отправленных статусов."""
+        return dict(self._statuses.get(key, {}))
+
+    def save_status(self, key, homework, status):
+        """Сохрани последний отправленный статус работы."""
+        self._statuses.setdefault(key, {})[homework] = status
+
+
+class AppendOnlyFileStore(MemoryStore):
+    """Хранилище в append-only файле JSON-строк.
+
+    При открытии файл читается целиком, последняя запись побеждает.
+    Оборванная последняя строка (процесс остановлен во время записи)
+    пропускается. Когда записей в файле становится вдвое больше, чем
+    актуальных значений (и не меньше min_records), файл переписывается
+    заново: новый файл пишется рядом и заменяет старый через
+    os.replace, поэтому при сбое остается один из двух целых файлов.
+    """
+
+    def __init__(self, path, min_records=COMPACT_MIN_RECORDS):
+        """Восстанови состояние из файла и открой его на дозапись."""
+        super().__init__()
+        self.path = path
+        self.min_records = min_records
+        self._lock = threading.Lock()
+        self._records = 0
+        broken = False
+        if os.path.exists(path):
+            broken = self._load(path)
+        self._file = open(path, 'a', encoding='UTF-8')
+        if broken or self._should_compact():
+            self.compact()
+
+    def _load(self, path):
+        with open(path, encoding='UTF-8', errors='replace') as file:
+            for number, line in enumerate(file, 1):
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(
+                        'Строка %s файла %s повреждена, она и следующие '
+                        'строки пропущены.', number, path
+                    )
+                    return True
+                self._records += 1
+        return False
+
+    def _live_records(self):
+        return len(self._cursors) + sum(
+            len(statuses) for statuses in self._statuses.values()
+        )
+
+    def _should_compact(self):
+        return (
+            self._records >= self.min_records
+            and self._records > 2 * self._live_records()
+        )
+
+    def _dump(self):
+        for key, current_date in self._cursors.items():
+            yield {'key': key, 'current_date': current_date}
+        for key, statuses in self._statuses.items():
+            for homework, status in statuses.items():
+                yield {'key': key, 'homework': homework, 'status': status}
+
+    def compact(self):
+        """Перепиши файл, оставив только актуальные значения."""
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='UTF-8') as file:
+            for record in self._dump():
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        self._file.close()
+        os.replace(temporary, self.path)
+        self._file = open(self.path, 'a', encoding='UTF-8')
+        self._records = self._live_records()
+
+    def _apply(self, record):
+        if 'current_date' in record:
+            super().save_cursor(record['key'], record['current_date'])
+        else:
+            super().save_status(
+                record['key'], record['homework'], record['status']
+            )
+
+    def _append(self, record):
+        with self._lock:
+            self._apply(record)
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._records += 1
+            if self._should_compact():
+                self.compact()
+
+    def save_cursor(self, key, current_date):
+        """Сохрани current_date подписки."""
+        self._append({'key': key, 'current_date': current_date})
+
+    def save_status(self, key, homework, status):
+        """Сохрани последний отправленный статус работы."""
+        self._append({'key': key, 'homework': homework, 'status': status})
+
+    def close(self):
+        """Закрой файл."""
+        self._file.close()
+
+
+class SQLiteStore(CheckpointStore):
+    """Хранилище в локальной базе SQLite."""
+
+    def __init__(self, path):
+        """Открой базу и создай таблицы, если их нет."""
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS cursors ('
+                'key TEXT PRIMARY KEY, checkpoint INTEGER NOT NULL)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS statuses ('
+                'key TEXT NOT NULL, homework TEXT NOT NULL, '
+                'status TEXT NOT NULL, PRIMARY KEY (key, homework))'
+            )
+
+    def load_cursor(self, key):
+        """Верни сохраненный current_date подписки или 0."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT checkpoint FROM cursors WHERE key = ?', (key,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def save_cursor(self, key, current_date):
+        """Сохрани current_date подписки."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                (key, current_date)
+            )
+
+    def load_statuses(self, key):
+        """Верни словарь {работа: статус} последних отправленных статусов."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT homework, status FROM statuses WHERE key = ?', (key,)
+            ).fetchall()
+        return dict(rows)
+
+    def save_status(self, key, homework, status):
+        """Сохрани последний отправленный статус работы."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                (key, homework, status)
+            )
+
+    def close(self):
+        """Закрой соединение с базой."""
+        self._connection.close()
+
+
+def open_store(path=STATE_STORE):
+    """Открой хранилище по пути: .db/.sqlite — SQLite, иначе файл.
+
+    Без пути состояние хранится только в памяти.
+    """
+    if not path:
+        return MemoryStore()
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SQLiteStore(path)
+    return AppendOnlyFileStore(path)
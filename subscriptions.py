@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+
+from exceptions import RequiredVariableEError
+
+
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+
+
+class Subscription:
+    """Подписка: токен Практикума и чат, куда отправлять статусы.
+
+    interval, если задан, заменяет интервал опроса по статусу.
+    pending — date_updated (в секундах) самых ранних работ из
+    отправляемых сообщений, undelivered — из сообщений, которые
+    отправить не удалось: курсор не сдвигается дальше меньшего из них.
+    """
+
+    __slots__ = (
+        'token', 'chat_id', 'from_date', 'status', 'failures',
+        'etag', 'last_modified', 'fingerprint', 'interval', 'pending',
+        'undelivered'
+    )
+
+    def __init__(self, token, chat_id, from_date=0):
+        """Запомни токен, чат и дату, с которой запрашивать статусы."""
+        self.token = token
+        self.chat_id = chat_id
+        self.from_date = from_date
+        self.status = None
+        self.failures = 0
+        self.etag = None
+        self.last_modified = None
+        self.fingerprint = None
+        self.interval = None
+        self.pending = []
+        self.undelivered = []
+
+    def __repr__(self):
+        """Покажи подписку без токена."""
+        return f'Subscription(chat_id={self.chat_id!r})'
+
+
+class SubscriptionRegistry:
+    """Реестр подписок вида токен -> чат.
+
+    Реестр меняет поток опроса, а читают и потоки команд бота, поэтому
+    изменения и снимки для перебора делаются под блокировкой.
+    """
+
+    def __init__(self):
+        """Создай пустой реестр."""
+        self._subscriptions = {}
+        self._chats = {}
+        self._lock = threading.Lock()
+
+    def add(self, token, chat_id):
+        """Добавь подписку или обнови чат существующей."""
+        with self._lock:
+            subscription = self._subscriptions.get(token)
+            if subscription is None:
+                subscription = Subscription(token, chat_id)
+                self._subscriptions[token] = subscription
+            else:
+                self._unlink_chat(subscription)
+                subscription.chat_id = chat_id
+            self._chats.setdefault(str(chat_id), set()).add(token)
+        return subscription
+
+    def _unlink_chat(self, subscription):
+        tokens = self._chats.get(str(subscription.chat_id))
+        if tokens is not None:
+            tokens.discard(subscription.token)
+            if not tokens:
+                del self._chats[str(subscription.chat_id)]
+
+    def remove(self, token):
+        """Удали подписку, верни удаленную запись или None."""
+        with self._lock:
+            subscription = self._subscriptions.pop(token, None)
+            if subscription is not None:
+                self._unlink_chat(subscription)
+        return subscription
+
+    def get(self, token):
+        """Верни подписку по токену."""
+        return self._subscriptions.get(token)
+
+    def for_chat(self, chat_id):
+        """Верни подписки, статусы которых отправляются в чат chat_id."""
+        with self._lock:
+            return [
+                self._subscriptions[token]
+                for token in self._chats.get(str(chat_id), ())
+            ]
+
+    def __iter__(self):
+        """Перебери снимок подписок."""
+        with self._lock:
+            return iter(list(self._subscriptions.values()))
+
+    def __len__(self):
+        """Верни количество подписок."""
+        return len(self._subscriptions)
+
+    def __contains__(self, token):
+        """Проверь, есть ли подписка с таким токеном."""
+        return token in self._subscriptions
+
+
+def save_subscriptions(registry, path=SUBSCRIPTIONS_FILE):
+    """Запиши реестр в JSON-файл {токен: чат}, заменив файл целиком."""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='UTF-8') as file:
+        json.dump(
+            {
+                subscription.token: subscription.chat_id
+                for subscription in registry
+            },
+            file, ensure_ascii=False, indent=2
+        )
+    os.replace(temporary, path)
+
+
+def load_subscriptions(path=SUBSCRIPTIONS_FILE, token=None, chat_id=None):
+    """Собери реестр из JSON-файла {токен: чат} и пары из окружения."""
+    registry = SubscriptionRegistry()
+    if token and chat_id:
+        registry.add(token, chat_id)
+    if path:
+        with open(path, encoding='UTF-8') as file:
+            entries = json.load(file)
+        if not isinstance(entries, dict):
+            raise TypeError(
+                f'Файл подписок {path} должен содержать словарь '
+                f'токен -> чат. Получен {type(entries)}'
+            )
+        for entry_token, entry_chat_id in entries.items():
+            registry.add(entry_token, entry_chat_id)
+    if not registry:
+        raise RequiredVariableEError(
+            'Нет ни одной подписки: задайте SUBSCRIPTIONS_FILE '
+            'или PRACTICUM_TOKEN и TELEGRAM_CHAT_ID.'
+        )
+    return registry
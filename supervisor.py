@@ -0,0 +1,308 @@
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from breaker import backoff_delay
+from connection_pool import create_session, export_pool_stats
+from exceptions import RequiredVariableEError
+from homework import PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_TOKEN
+from logs import setup_logging, setup_queue_logging
+from metrics import METRICS_PORT, OUTBOX_DEPTH, start_metrics_server
+from outbox import Outbox
+from scheduler import API_RATE_LIMIT, AdaptiveScheduler, stagger
+from storage import SQLiteStore, open_store, subscription_key
+from subscriptions import load_subscriptions
+from worker import Poller
+
+
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', os.cpu_count() or 1))
+RESTART_BACKOFF = float(os.getenv('RESTART_BACKOFF', 1))
+RESTART_BACKOFF_MAX = float(os.getenv('RESTART_BACKOFF_MAX', 60))
+STABLE_PERIOD = 60
+CHECK_PERIOD = 1
+
+logger = logging.getLogger('supervisor')
+
+
+def partition(subscriptions, index, processes):
+    """Верни подписки, которые опрашивает процесс index из processes."""
+    return [
+        subscription for subscription in subscriptions
+        if int(subscription_key(subscription.token), 16) % processes == index
+    ]
+
+
+class RemoteOutbox:
+    """Очередь отправки процесса-воркера.
+
+    Сообщения уходят супервизору, который отправляет их в Telegram
+    с общими для всех процессов лимитами. Ответ об отправке приходит
+    в очередь acks, и по нему вызывается on_sent или on_failed.
+    Статусы из checkpoint супервизор сохраняет в общем STATE_STORE сам,
+    поэтому они не теряются, если процесс завершится раньше ответа.
+    """
+
+    def __init__(self, index, outgoing, acks):
+        """Запомни номер процесса и очереди к супервизору и от него."""
+        self.index = index
+        self.outgoing = outgoing
+        self.acks = acks
+        self._callbacks = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def put(self, chat_id, text, on_sent=None, on_failed=None,
+            checkpoint=None):
+        """Передай сообщение супервизору, не дожидаясь отправки.
+
+        on_sent вызывается после отправки, on_failed(permanent) — если
+        сообщение отправить не удалось.
+        """
+        message_id = (os.getpid(), next(self._counter))
+        wants_ack = on_sent is not None or on_failed is not None
+        if wants_ack:
+            with self._lock:
+                self._callbacks[message_id] = (on_sent, on_failed)
+        self.outgoing.put(
+            (self.index, message_id, chat_id, text, wants_ack, checkpoint)
+        )
+
+    def __len__(self):
+        """Верни число сообщений, ожидающих ответа супервизора."""
+        return len(self._callbacks)
+
+    def start(self):
+        """Запусти поток приема ответов."""
+        self._thread = threading.Thread(
+            target=self.run, name='acks', daemon=True
+        )
+        self._thread.start()
+
+    def run(self):
+        """Вызывай on_sent или on_failed по ответам до сигнала остановки."""
+        while True:
+            ack = self.acks.get()
+            if ack is None:
+                return
+            message_id, sent, permanent = ack
+            with self._lock:
+                on_sent, on_failed = self._callbacks.pop(
+                    message_id, (None, None)
+                )
+            if sent:
+                callback, args = on_sent, ()
+            else:
+                callback, args = on_failed, (permanent,)
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception(
+                    'Ошибка обработки ответа супервизора о сообщении %s.',
+                    message_id
+                )
+
+
+def run_partition(index, processes, outgoing, acks, records):
+    """Опрашивай свою часть подписок в дочернем процессе."""
+    if records is not None:
+        setup_queue_logging(records)
+    registry = load_subscriptions(
+        token=PRACTICUM_TOKEN, chat_id=TELEGRAM_CHAT_ID
+    )
+    subscriptions = partition(registry, index, processes)
+    if not subscriptions:
+        logger.info('Процессу %s не досталось подписок.', index)
+        return
+    outbox = RemoteOutbox(index, outgoing, acks)
+    outbox.start()
+    OUTBOX_DEPTH.set_function(lambda: len(outbox))
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT) + 1 + index)
+    session = create_session()
+    export_pool_stats(session)
+    poller = Poller(None, session, open_store(), outbox=outbox)
+    poller.restore_checkpoints(subscriptions)
+    scheduler = AdaptiveScheduler(rate=API_RATE_LIMIT / processes)
+    stagger(scheduler, subscriptions)
+    logger.info(
+        'Процесс %s опрашивает %d подписок.', index, len(subscriptions)
+    )
+    scheduler.run(poller.poll)
+
+
+class Supervisor:
+    """Запускает процессы опроса и отправляет их сообщения.
+
+    Каждый из processes процессов опрашивает свою часть подписок.
+    Упавший процесс перезапускается с той же частью подписок и
+    продолжает с курсоров, сохраненных в общем STATE_STORE; частые
+    падения подряд откладывают перезапуск экспоненциально.
+    """
+
+    def __init__(self, outbox, records, processes=WORKER_PROCESSES,
+                 target=run_partition, context=None, clock=time.monotonic):
+        """Подготовь очереди и пустую таблицу процессов."""
+        self.outbox = outbox
+        self.records = records
+        self.processes = processes
+        self.target = target
+        self.context = (
+            multiprocessing.get_context('spawn') if context is None
+            else context
+        )
+        self.clock = clock
+        self.outgoing = self.context.Queue()
+        self._workers = [None] * processes
+        self._acks = [None] * processes
+        self._started = [0] * processes
+        self._crashes = [0] * processes
+        self._restart_at = [None] * processes
+        self._stopping = threading.Event()
+        self._forwarder = None
+
+    def start_worker(self, index):
+        """Запусти процесс index с новой очередью ответов."""
+        self._acks[index] = self.context.Queue()
+        process = self.context.Process(
+            target=self.target, name=f'worker-{index}', args=(
+                index, self.processes, self.outgoing, self._acks[index],
+                self.records
+            )
+        )
+        process.start()
+        self._workers[index] = process
+        self._started[index] = self.clock()
+        self._restart_at[index] = None
+
+    def start(self):
+        """Запусти все процессы и поток пересылки сообщений."""
+        self._forwarder = threading.Thread(
+            target=self.forward, name='forwarder', daemon=True
+        )
+        self._forwarder.start()
+        for index in range(self.processes):
+            self.start_worker(index)
+
+    def forward(self):
+        """Ставь сообщения процессов в общую очередь отправки.
+
+        Ответ об отправке уходит в очередь процесса, поставившего
+        сообщение; если процесс уже перезапущен, ответ никто не прочтет,
+        но статусы сообщения все равно сохранит очередь отправки.
+        """
+        while True:
+            message = self.outgoing.get()
+            if message is None:
+                return
+            index, message_id, chat_id, text, wants_ack, checkpoint = message
+            if not wants_ack:
+                self.outbox.put(chat_id, text, checkpoint=checkpoint)
+                continue
+            acks = self._acks[index]
+            self.outbox.put(
+                chat_id, text,
+                lambda: acks.put((message_id, True, False)),
+                lambda permanent: acks.put((message_id, False, permanent)),
+                checkpoint
+            )
+
+    def check(self):
+        """Перезапусти упавшие процессы, когда подойдет их время."""
+        now = self.clock()
+        for index, process in enumerate(self._workers):
+            if self._restart_at[index] is not None:
+                if now >= self._restart_at[index]:
+                    self.start_worker(index)
+                continue
+            if process.is_alive() or process.exitcode == 0:
+                continue
+            if now - self._started[index] >= STABLE_PERIOD:
+                self._crashes[index] = 0
+            delay = backoff_delay(
+                self._crashes[index], RESTART_BACKOFF, RESTART_BACKOFF_MAX
+            )
+            self._crashes[index] += 1
+            self._restart_at[index] = now + delay
+            logger.error(
+                'Процесс %s завершился с кодом %s, перезапуск через %.1f с.',
+                index, process.exitcode, delay
+            )
+
+    def run(self):
+        """Следи за процессами до вызова stop()."""
+        self.start()
+        while not self._stopping.wait(CHECK_PERIOD):
+            self.check()
+        self.shutdown()
+
+    def stop(self, *args):
+        """Попроси цикл run() завершиться."""
+        self._stopping.set()
+
+    def shutdown(self, timeout=10):
+        """Останови процессы и допиши уже переданные сообщения."""
+        for process in self._workers:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._workers:
+            if process is not None:
+                process.join(timeout)
+        self.outgoing.put(None)
+        self._forwarder.join(timeout)
+        self.outbox.stop(timeout)
+
+
+def parse_args(args=None):
+    """Разбери аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        '--processes', type=int, default=WORKER_PROCESSES,
+        help='число процессов опроса'
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None, records=None):
+    """Опрашивай подписки несколькими процессами, отправляй одним."""
+    import telegram
+
+    options = parse_args(args)
+    try:
+        if not TELEGRAM_TOKEN:
+            raise RequiredVariableEError(
+                'Отсутствует обязательная переменная TELEGRAM_TOKEN.'
+            )
+        load_subscriptions(token=PRACTICUM_TOKEN, chat_id=TELEGRAM_CHAT_ID)
+        store = open_store()
+        store.close()
+        if not isinstance(store, SQLiteStore):
+            raise RequiredVariableEError(
+                'Для нескольких процессов нужен STATE_STORE в базе SQLite.'
+            )
+    except (RequiredVariableEError, OSError, ValueError, TypeError) as error:
+        logger.critical(error)
+        sys.exit(error)
+    outbox = Outbox(telegram.Bot(token=TELEGRAM_TOKEN), store=open_store())
+    outbox.start()
+    OUTBOX_DEPTH.set_function(lambda: len(outbox))
+    if METRICS_PORT:
+        start_metrics_server()
+    supervisor = Supervisor(outbox, records, options.processes)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    supervisor.run()
+
+
+if __name__ == '__main__':
+    log_records = multiprocessing.get_context('spawn').Queue()
+    setup_logging(__file__ + '.log', records=log_records)
+    main(records=log_records)
@@ -0,0 +1,47 @@
+from utils import FakeClock
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_probes_after_timeout(self):
+        import breaker
+
+        clock = FakeClock()
+        circuit = breaker.CircuitBreaker(threshold=2, timeout=10, clock=clock)
+        circuit.record_failure()
+        assert circuit.allow()
+        circuit.record_failure()
+        assert circuit.state == breaker.OPEN
+        assert not circuit.allow()
+
+        clock.now = 10
+        assert circuit.allow()
+        assert circuit.state == breaker.HALF_OPEN
+        assert not circuit.allow()
+
+        circuit.record_success()
+        assert circuit.state == breaker.CLOSED
+        assert circuit.allow()
+
+    def test_failed_probe_reopens_with_longer_timeout(self):
+        import breaker
+
+        clock = FakeClock()
+        circuit = breaker.CircuitBreaker(threshold=1, timeout=10, clock=clock)
+        circuit.record_failure()
+        clock.now = 10
+        assert circuit.allow()
+        circuit.record_failure()
+        assert circuit.state == breaker.OPEN
+        clock.now = 19.9
+        assert not circuit.allow()
+        clock.now = 30
+        assert circuit.allow()
+
+    def test_backoff_delay_grows_and_is_capped(self):
+        import breaker
+
+        for attempt, low, high in [(0, 5, 10), (3, 40, 80), (20, 50, 100)]:
+            for _ in range(50):
+                delay = breaker.backoff_delay(attempt, base=10, cap=100)
+                assert low <= delay <= high
@@ -0,0 +1,32 @@
+class TestStatusCache:
+
+    def test_evicts_least_recently_used(self):
+        import cache
+
+        status_cache = cache.StatusCache(maxsize=2)
+        first = {'id': 1, 'status': 'reviewing'}
+        second = {'id': 2, 'status': 'reviewing'}
+        third = {'id': 3, 'status': 'reviewing'}
+        status_cache.remember_status('key', first)
+        status_cache.remember_status('key', second)
+        assert not status_cache.is_new_status('key', first)
+        status_cache.remember_status('key', third)
+
+        assert len(status_cache) == 2
+        assert not status_cache.is_new_status('key', first)
+        assert status_cache.is_new_status('key', second)
+
+    def test_falls_back_to_store(self):
+        import cache
+        import storage
+
+        store = storage.MemoryStore()
+        store.save_status('key', '1', 'approved')
+        status_cache = cache.StatusCache(store=store)
+
+        assert not status_cache.is_new_status(
+            'key', {'id': 1, 'status': 'approved'}
+        )
+        assert status_cache.is_new_status(
+            'key', {'id': 1, 'status': 'rejected'}
+        )
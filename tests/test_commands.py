@@ -0,0 +1,157 @@
+import json
+import os
+from types import SimpleNamespace
+
+from utils import FakeClock
+
+
+class FakeMessage:
+
+    def __init__(self):
+        self.replies = []
+        self.deleted = False
+
+    def reply_text(self, text):
+        self.replies.append(text)
+
+    def delete(self):
+        self.deleted = True
+
+
+class FakeScheduler:
+
+    def __init__(self):
+        self.added = []
+
+    def add(self, subscription, delay=0):
+        self.added.append((subscription.token, delay))
+
+
+class FakePoller:
+
+    def __init__(self):
+        self.restored = []
+
+    def restore_checkpoints(self, subscriptions):
+        self.restored.extend(subscriptions)
+
+
+def make_update(chat_id):
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_message=FakeMessage()
+    )
+
+
+def make_commands(tmp_path=None):
+    import cache
+    import commands
+    import subscriptions
+
+    registry = subscriptions.SubscriptionRegistry()
+    registry.add('token', 42)
+    path = None if tmp_path is None else str(tmp_path / 'subscriptions.json')
+    clock = FakeClock()
+    return commands.BotCommands(
+        registry, cache.StatusCache(), path, refresh_interval=60, clock=clock
+    ), clock
+
+
+class TestBotCommands:
+
+    def test_status_and_history_come_from_cache(self):
+        from storage import subscription_key
+
+        bot_commands, _ = make_commands()
+        key = subscription_key('token')
+        homework = {
+            'id': 1, 'homework_name': 'hw.zip', 'status': 'approved',
+            'date_updated': '2020-02-13T14:40:57Z',
+        }
+        bot_commands.cache.observe(key, [homework])
+        bot_commands.cache.remember_status(key, homework)
+
+        update = make_update(42)
+        bot_commands.status(update, None)
+        bot_commands.history(update, None)
+        status, history = update.effective_message.replies
+        assert status.startswith('"hw.zip": Работа проверена')
+        assert history.startswith('2020-02-13T14:40:57Z: "hw.zip"')
+
+    def test_unknown_chat_gets_hint(self):
+        import commands
+
+        bot_commands, _ = make_commands()
+        update = make_update(1)
+        bot_commands.status(update, None)
+        assert update.effective_message.replies == [commands.NO_SUBSCRIPTION]
+
+    def test_refreshes_are_coalesced(self):
+        bot_commands, clock = make_commands()
+        scheduler = FakeScheduler()
+        for _ in range(3):
+            bot_commands.refresh(make_update(42), None)
+        bot_commands.apply(scheduler, FakePoller())
+        clock.now = 30
+        bot_commands.refresh(make_update(42), None)
+        bot_commands.apply(scheduler, FakePoller())
+        assert scheduler.added == [('token', 0)]
+        assert bot_commands.registry.get('token').from_date == 0
+
+        clock.now = 61
+        bot_commands.refresh(make_update(42), None)
+        bot_commands.apply(scheduler, FakePoller())
+        assert len(scheduler.added) == 2
+
+    def test_subscribe_adds_and_saves_subscription(self, tmp_path):
+        bot_commands, _ = make_commands(tmp_path)
+        scheduler = FakeScheduler()
+        poller = FakePoller()
+        update = make_update(7)
+        bot_commands.subscribe(update, SimpleNamespace(args=['new-token']))
+        assert update.effective_message.deleted
+        assert 'new-token' not in bot_commands.registry
+
+        bot_commands.apply(scheduler, poller)
+        assert [s.token for s in bot_commands.registry.for_chat(7)] == [
+            'new-token'
+        ]
+        assert [s.token for s in poller.restored] == ['new-token']
+        assert scheduler.added == [('new-token', 0)]
+        saved = json.loads((tmp_path / 'subscriptions.json').read_text())
+        assert saved == {'token': 42, 'new-token': 7}
+
+    def test_subscribe_reports_undeleted_token(self):
+        bot_commands, _ = make_commands()
+        update = make_update(7)
+
+        def delete():
+            raise RuntimeError('Message can\'t be deleted')
+
+        update.effective_message.delete = delete
+        bot_commands.subscribe(update, SimpleNamespace(args=['new-token']))
+        assert 'удалено' not in update.effective_message.replies[0]
+        assert 'удалите его сами' in update.effective_message.replies[0]
+
+    def test_profile_only_from_admin_chat(self, tmp_path):
+        import commands
+        import profiler
+
+        sampler = profiler.SamplingProfiler(
+            str(tmp_path), window=5, interval=0.001
+        )
+        bot_commands = commands.BotCommands(
+            make_commands()[0].registry, None, profiler=sampler,
+            admin_chat_id='1'
+        )
+        stranger = make_update(42)
+        bot_commands.profile(stranger, None)
+        assert not sampler.running
+        assert stranger.effective_message.replies == []
+
+        bot_commands.profile(make_update(1), None)
+        assert sampler.running
+        bot_commands.profile(make_update(1), None)
+        sampler._thread.join(1)
+        assert not sampler.running
+        assert os.path.exists(sampler.path)
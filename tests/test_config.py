@@ -0,0 +1,123 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def verdicts():
+    from homework import HOMEWORK_VERDICTS
+
+    saved = dict(HOMEWORK_VERDICTS)
+    yield HOMEWORK_VERDICTS
+    HOMEWORK_VERDICTS.clear()
+    HOMEWORK_VERDICTS.update(saved)
+
+
+def make_reloader(tmp_path, entries, config=None):
+    import config as config_module
+    import scheduler
+    import subscriptions
+    import worker
+
+    subscriptions_file = tmp_path / 'subscriptions.json'
+    subscriptions_file.write_text(json.dumps(entries))
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(config or {}))
+    loaded = config_module.load_config(str(config_file))
+    registry = subscriptions.load_subscriptions(
+        str(subscriptions_file), loaded.practicum_token,
+        loaded.telegram_chat_id
+    )
+    adaptive = scheduler.AdaptiveScheduler(jitter=0)
+    scheduler.stagger(adaptive, registry)
+    reloader = config_module.ConfigReloader(
+        registry, adaptive, worker.Poller(None),
+        str(config_file), str(subscriptions_file)
+    )
+    return reloader, subscriptions_file, config_file
+
+
+def rewrite(path, data):
+    path.write_text(json.dumps(data))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestConfig:
+
+    def test_file_overrides_defaults(self):
+        import config
+
+        loaded = config.Config.from_dict({
+            'poll_intervals': {'reviewing': 30},
+            'tenants': {'abc': {'interval': 15}},
+        })
+        assert loaded.poll_intervals['reviewing'] == 30
+        assert loaded.poll_intervals['approved'] == 1800
+        assert loaded.tenants == {'abc': 15}
+        assert loaded.verdicts == config.DEFAULT_VERDICTS
+
+    @pytest.mark.parametrize('data, error', [
+        ({'idle_period': '600'}, TypeError),
+        ({'idle_period': 0}, ValueError),
+        ({'poll_intervals': [60]}, TypeError),
+        ({'tenants': {'abc': {'chat_id': 1}}}, ValueError),
+        ({'retry': 600}, ValueError),
+    ])
+    def test_wrong_types_raise(self, data, error):
+        import config
+
+        with pytest.raises(error):
+            config.Config.from_dict(data)
+
+
+class TestConfigReloader:
+
+    def test_subscriptions_diff_keeps_in_flight_poll(self, tmp_path):
+        reloader, subscriptions_file, _ = make_reloader(
+            tmp_path, {'token-1': '1', 'token-2': '2'}
+        )
+        in_flight = reloader.registry.get('token-1')
+        kept = reloader.registry.get('token-2')
+        while reloader.scheduler.pop_due()[0] is not in_flight:
+            pass
+
+        rewrite(subscriptions_file, {'token-2': '20', 'token-3': '3'})
+        assert reloader.check()
+
+        assert 'token-1' not in reloader.registry
+        assert reloader.registry.get('token-2') is kept
+        assert kept.chat_id == '20'
+        assert reloader.registry.get('token-3').chat_id == '3'
+        reloader.scheduler._put_back(in_flight, 0)
+        assert len(reloader.scheduler) == len(reloader.registry)
+        assert not reloader.check()
+
+    def test_intervals_and_verdicts_reload(self, tmp_path, verdicts):
+        from storage import subscription_key
+
+        reloader, _, config_file = make_reloader(tmp_path, {'token-1': '1'})
+        rewrite(config_file, {
+            'poll_intervals': {'reviewing': 30},
+            'verdicts': dict(verdicts, reviewing='На ревью.'),
+            'tenants': {subscription_key('token-1'): {'interval': 15}},
+        })
+        assert reloader.check()
+
+        subscription = reloader.registry.get('token-1')
+        assert reloader.scheduler.interval_for('reviewing') == 30
+        assert reloader.scheduler.next_interval(subscription) == 15
+        assert verdicts['reviewing'] == 'На ревью.'
+
+    def test_broken_file_keeps_previous_config(self, tmp_path, verdicts):
+        reloader, _, config_file = make_reloader(
+            tmp_path, {'token-1': '1'}, {'idle_period': 100}
+        )
+        reloader.reload()
+        config_file.write_text('{"idle_period": ')
+        reloader.request()
+
+        assert not reloader.check()
+        assert reloader.scheduler.idle_period == 100
+        assert 'token-1' in reloader.registry
@@ -0,0 +1,67 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class PracticumHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_endpoint(monkeypatch):
+    import homework
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PracticumHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        homework, 'ENDPOINT', f'http://127.0.0.1:{server.server_port}/'
+    )
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+class TestConnectionPool:
+
+    def test_session_reuses_connections(self, local_endpoint):
+        import connection_pool
+        import homework
+
+        session = connection_pool.create_session(pool_maxsize=2)
+        for _ in range(5):
+            response = homework.request_homework_statuses('token', 0, session)
+            assert response['current_date'] == 1
+
+        assert connection_pool.pool_stats(session) == {
+            'requests': 5,
+            'new_connections': 1,
+            'reused_connections': 4,
+        }
+
+    def test_pool_stats_are_exported(self, local_endpoint):
+        import connection_pool
+        import homework
+        import metrics
+
+        session = connection_pool.create_session(pool_maxsize=2)
+        connection_pool.export_pool_stats(session)
+        for _ in range(3):
+            homework.request_homework_statuses('token', 0, session)
+
+        rendered = metrics.REGISTRY.render()
+        assert 'homework_pool_new_connections 1' in rendered
+        assert 'homework_pool_reused_connections 2' in rendered
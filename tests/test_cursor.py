@@ -0,0 +1,98 @@
+import time
+
+import pytest
+import requests
+import telegram
+
+import utils
+
+
+class TestCursor:
+
+    def test_overlap_window(self):
+        import cursor
+
+        assert cursor.request_from_date(0, 60) == 0
+        assert cursor.request_from_date(30, 60) == 0
+        assert cursor.request_from_date(1000, 60) == 940
+
+    def test_cursor_never_moves_back(self):
+        import cursor
+
+        assert cursor.advance_cursor(100, {'current_date': 200}) == 200
+        assert cursor.advance_cursor(200, {'current_date': 150}) == 200
+        assert cursor.advance_cursor(200, {}) == 200
+        assert cursor.advance_cursor(200, {'current_date': 'вчера'}) == 200
+
+    def test_main_sends_integer_cursor_with_overlap(self, monkeypatch):
+        import cursor
+        import homework
+
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(
+            telegram, 'Bot', lambda **kwargs: utils.MockTelegramBot()
+        )
+        cursors = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            from_date = params['from_date']
+            cursors.append(from_date)
+            return utils.MockResponseGET(random_timestamp=from_date + 1000)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        sleeps = []
+
+        def mock_sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                raise utils.BreakInfiniteLoop
+
+        monkeypatch.setattr(time, 'sleep', mock_sleep)
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework.main()
+
+        overlap = cursor.CURSOR_OVERLAP
+        assert cursors == [0, 1000 - overlap, 2000 - 2 * overlap]
+
+    def test_main_holds_cursor_until_sent(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '12345')
+        sent = []
+
+        class MockBot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+                if len(sent) == 1:
+                    raise telegram.error.NetworkError('Нет сети')
+
+        monkeypatch.setattr(telegram, 'Bot', lambda **kwargs: MockBot())
+        cursors = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            cursors.append(params['from_date'])
+            return utils.MockResponseGET(data={
+                'homeworks': [{
+                    'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+                    'date_updated': '2020-02-13T10:00:00Z'
+                }],
+                'current_date': 1600000000
+            })
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+
+        def mock_sleep(seconds):
+            if len(cursors) == 3:
+                raise utils.BreakInfiniteLoop
+
+        monkeypatch.setattr(time, 'sleep', mock_sleep)
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework.main()
+
+        assert cursors[:2] == [0, 0]
+        assert cursors[2] > 0
+        assert len(sent) == 2
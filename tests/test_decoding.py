@@ -0,0 +1,41 @@
+import pytest
+
+
+class TestDecoding:
+
+    @pytest.mark.parametrize('name', ['json', 'orjson'])
+    def test_decoders_agree(self, name):
+        import decoding
+
+        try:
+            _, decode = decoding.get_decoder(name)
+        except ImportError:
+            pytest.skip(f'{name} не установлен')
+        assert decode(b'{"homeworks": [], "current_date": 1}') == {
+            'homeworks': [], 'current_date': 1
+        }
+
+    def test_validate_response_returns_homeworks(self, data_with_new_hw_status):
+        import decoding
+
+        assert decoding.validate_response(data_with_new_hw_status) == (
+            data_with_new_hw_status['homeworks']
+        )
+
+    @pytest.mark.parametrize('response, error', [
+        ([], TypeError),
+        ({'current_date': 1}, KeyError),
+        ({'homeworks': []}, KeyError),
+        ({'homeworks': {}, 'current_date': 1}, TypeError),
+        ({'homeworks': [], 'current_date': '1'}, TypeError),
+        ({'homeworks': [[]], 'current_date': 1}, TypeError),
+        ({'homeworks': [{'status': 'approved'}], 'current_date': 1},
+         KeyError),
+        ({'homeworks': [{'homework_name': 'hw', 'status': 'unknown'}],
+          'current_date': 1}, KeyError),
+    ])
+    def test_validate_invalid_response(self, response, error):
+        import decoding
+
+        with pytest.raises(error):
+            decoding.validate_response(response)
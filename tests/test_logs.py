@@ -0,0 +1,80 @@
+import json
+import logging
+import sys
+
+
+class TestLogs:
+
+    def test_json_formatter_adds_context(self):
+        import logs
+
+        record = logging.LogRecord(
+            'worker', logging.INFO, __file__, 1, 'Статус %s', ('approved',),
+            None
+        )
+        record.tenant = 'abc'
+        record.homework = ['1']
+        data = json.loads(logs.JSONFormatter().format(record))
+
+        assert data['message'] == 'Статус approved'
+        assert data['tenant'] == 'abc'
+        assert data['homework'] == ['1']
+        assert data['level'] == 'INFO'
+
+    def test_parse_levels(self):
+        import logs
+
+        assert logs.parse_levels('worker=info, outbox=WARNING') == {
+            'worker': 'INFO', 'outbox': 'WARNING'
+        }
+        assert logs.parse_levels('') == {}
+
+    def test_setup_logging_writes_through_queue(self, tmp_path):
+        import logs
+
+        root = logging.getLogger()
+        saved_handlers, saved_level = root.handlers[:], root.level
+        path = tmp_path / 'bot.log'
+        try:
+            listener = logs.setup_logging(
+                str(path), level='INFO', levels='noisy=ERROR',
+                log_format='json'
+            )
+            logging.getLogger('worker').info(
+                'опрос', extra={'tenant': 'abc'}
+            )
+            logging.getLogger('noisy').warning('скрыто')
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logging.getLogger('worker').exception('сбой %s', 1)
+            listener.stop()
+        finally:
+            root.handlers[:] = saved_handlers
+            root.setLevel(saved_level)
+            logging.getLogger('noisy').setLevel(logging.NOTSET)
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line['message'] for line in lines] == ['опрос', 'сбой 1']
+        assert lines[0]['tenant'] == 'abc'
+        assert 'ZeroDivisionError' in lines[1]['exception']
+
+    def test_exception_crosses_process_queue(self):
+        import multiprocessing
+        import pickle
+
+        import logs
+
+        handler = logs.RecordQueueHandler(multiprocessing.Queue())
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = logging.getLogger('worker').makeRecord(
+                'worker', logging.ERROR, __file__, 1, 'сбой %s', (1,),
+                sys.exc_info()
+            )
+        record = pickle.loads(pickle.dumps(handler.prepare(record)))
+        data = json.loads(logs.JSONFormatter().format(record))
+
+        assert data['message'] == 'сбой 1'
+        assert 'ZeroDivisionError' in data['exception']
@@ -0,0 +1,41 @@
+import urllib.request
+
+
+class TestMetrics:
+
+    def test_render_prometheus_text(self):
+        import metrics
+
+        registry = metrics.Registry()
+        counter = registry.counter('test_total', 'Счетчик.')
+        histogram = registry.histogram('test_seconds', 'Время.', (0.1, 1))
+        gauge = registry.gauge('test_depth', 'Глубина.')
+        counter.inc(status=200)
+        counter.inc(2, status=200)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        gauge.set_function(lambda: 7)
+
+        text = registry.render()
+        assert '# TYPE test_total counter' in text
+        assert 'test_total{status="200"} 3' in text
+        assert 'test_seconds_bucket{le="0.1"} 0' in text
+        assert 'test_seconds_bucket{le="1"} 1' in text
+        assert 'test_seconds_bucket{le="+Inf"} 2' in text
+        assert 'test_seconds_count 2' in text
+        assert 'test_depth 7' in text
+
+    def test_metrics_endpoint(self):
+        import metrics
+
+        metrics.PARSE_FAILURES.inc()
+        server = metrics.start_metrics_server(port=0)
+        try:
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{server.server_port}/metrics'
+            ) as response:
+                text = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'homework_parse_failures_total' in text
@@ -0,0 +1,112 @@
+import telegram
+
+from utils import FakeClock
+
+
+class FlakyBot:
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+
+
+def drain(outbox, clock):
+    while len(outbox):
+        if not outbox._queue.qsize():
+            clock.sleep(outbox._delayed_timeout())
+        outbox.process(sleep=clock.sleep)
+
+
+class TestOutbox:
+
+    def test_put_does_not_send(self):
+        import outbox
+
+        bot = FlakyBot()
+        messages = outbox.Outbox(bot)
+        messages.put(1, 'text')
+        assert bot.sent == []
+        assert len(messages) == 1
+
+    def test_retry_after_is_respected(self):
+        import outbox
+
+        clock = FakeClock()
+        bot = FlakyBot([telegram.error.RetryAfter(7)])
+        sent = []
+        messages = outbox.Outbox(bot, clock=clock)
+        messages.put(1, 'text', lambda: sent.append(clock.now))
+        assert messages.has_pending(1)
+        assert not messages.has_pending(2)
+        drain(messages, clock)
+
+        assert bot.sent == [(1, 'text')]
+        assert sent == [7]
+        assert not messages.has_pending(1)
+
+    def test_network_errors_are_retried_with_limit(self):
+        import outbox
+
+        clock = FakeClock()
+        bot = FlakyBot([telegram.error.TimedOut()] * 3)
+        messages = outbox.Outbox(bot, retries=2, clock=clock)
+        messages.put(1, 'text')
+        drain(messages, clock)
+
+        assert bot.sent == []
+        assert bot.errors == []
+
+    def test_bad_request_is_not_retried(self):
+        import outbox
+
+        clock = FakeClock()
+        bot = FlakyBot([
+            telegram.error.BadRequest('Chat not found'),
+            telegram.error.Unauthorized('Forbidden: bot was blocked'),
+        ])
+        failed = []
+        messages = outbox.Outbox(bot, clock=clock)
+        messages.put(1, 'first', on_failed=failed.append)
+        messages.put(2, 'second', on_failed=failed.append)
+        drain(messages, clock)
+
+        assert failed == [True, True]
+        assert bot.sent == []
+        assert clock.now == 0
+
+    def test_callback_error_does_not_stop_sending(self):
+        import sqlite3
+
+        import outbox
+
+        def on_sent():
+            raise sqlite3.OperationalError('database is locked')
+
+        clock = FakeClock()
+        bot = FlakyBot()
+        messages = outbox.Outbox(bot, clock=clock)
+        messages.put(1, 'first', on_sent)
+        messages.put(2, 'second')
+        drain(messages, clock)
+
+        assert bot.sent == [(1, 'first'), (2, 'second')]
+        assert not messages.has_pending(1)
+
+    def test_chat_limit_does_not_block_other_chats(self):
+        import outbox
+
+        clock = FakeClock()
+        bot = FlakyBot()
+        messages = outbox.Outbox(bot, chat_rate=1, clock=clock)
+        messages.put(1, 'first')
+        messages.put(1, 'second')
+        messages.put(2, 'other chat')
+        drain(messages, clock)
+
+        assert bot.sent == [(1, 'first'), (2, 'other chat'), (1, 'second')]
+        assert clock.now == 1
@@ -0,0 +1,73 @@
+import threading
+
+from utils import FakeClock
+
+
+class TestStageTimer:
+
+    def test_disabled_timer_counts_nothing(self):
+        import profiler
+
+        timer = profiler.StageTimer(enabled=False)
+        with timer.time('parse_status'):
+            pass
+        assert timer.snapshot()['parse_status'] == (0, 0)
+        assert timer.time('parse_status') is profiler.DISABLED
+
+    def test_enabled_timer_sums_stages(self):
+        import profiler
+
+        clock = FakeClock()
+        timer = profiler.StageTimer(enabled=True, clock=clock)
+        for _ in range(2):
+            with timer.time('get_api_answer'):
+                clock.now += 0.25
+        before = {stage: (0, 0) for stage in profiler.STAGES}
+        assert timer.snapshot()['get_api_answer'] == (2, 0.5)
+        assert 'get_api_answer: 2 вызовов, 0.500 с' in (
+            profiler.format_stages(before, timer.snapshot())
+        )
+
+    def test_homework_functions_are_timed(self, monkeypatch):
+        import homework
+        import profiler
+
+        timer = profiler.StageTimer(enabled=True)
+        monkeypatch.setattr(homework, 'stages', timer)
+        homework.check_response({'homeworks': []})
+        homework.parse_status({'homework_name': 'hw', 'status': 'approved'})
+        snapshot = timer.snapshot()
+        assert snapshot['check_response'][0] == 1
+        assert snapshot['parse_status'][0] == 1
+
+
+class TestSamplingProfiler:
+
+    def test_writes_folded_stacks_and_restores_timer(self, tmp_path):
+        import profiler
+
+        started = threading.Event()
+        stopping = threading.Event()
+
+        def busy_loop():
+            started.set()
+            stopping.wait(5)
+
+        worker = threading.Thread(target=busy_loop, name='busy')
+        worker.start()
+        started.wait(1)
+        timer = profiler.StageTimer(enabled=False)
+        sampler = profiler.SamplingProfiler(
+            str(tmp_path), window=0.05, interval=0.005, timer=timer
+        )
+        path = sampler.start()
+        assert sampler.start() is None
+        sampler._thread.join(2)
+        stopping.set()
+        worker.join()
+
+        lines = open(path, encoding='UTF-8').read().splitlines()
+        busy = [line for line in lines if line.startswith('busy;')]
+        assert busy and 'busy_loop (test_profiler.py:' in busy[0]
+        assert int(busy[0].rsplit(' ', 1)[1]) > 1
+        assert not timer.enabled
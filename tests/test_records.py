@@ -0,0 +1,40 @@
+class TestHomeworkRecord:
+
+    def test_known_statuses_match_verdicts(self):
+        import homework
+        import records
+
+        assert set(records.STATUSES[:3]) == set(homework.HOMEWORK_VERDICTS)
+
+    def test_record_round_trip(self):
+        import records
+
+        record = records.HomeworkRecord.from_homework({
+            'id': 123, 'homework_name': 'hw.zip', 'status': 'approved',
+            'date_updated': '2020-02-13T14:40:57Z',
+        })
+        assert record.status_code == records.STATUS_CODES['approved']
+        assert record.status == 'approved'
+        assert record.date_updated == '2020-02-13T14:40:57Z'
+        assert not hasattr(record, '__dict__')
+
+    def test_new_status_gets_new_code(self):
+        import records
+
+        code = records.status_code('on_hold')
+        assert code >= 3
+        assert records.status_code('on_hold') == code
+        assert records.STATUSES[code] == 'on_hold'
+
+    def test_same_state(self):
+        import records
+
+        first = records.HomeworkRecord.from_homework({
+            'id': 1, 'status': 'reviewing', 'date_updated': None,
+        })
+        second = records.HomeworkRecord.from_homework({
+            'id': 1, 'status': 'reviewing', 'date_updated': 'неизвестно',
+        })
+        assert first.same_state(second)
+        second.status_code = records.status_code('approved')
+        assert not first.same_state(second)
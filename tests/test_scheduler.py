@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+
+from utils import FakeClock
+
+
+class StopPolling(Exception):
+    pass
+
+
+class TestAdaptiveScheduler:
+
+    @pytest.mark.parametrize('status, interval', [
+        ('reviewing', 60), ('rejected', 600), ('approved', 1800), (None, 600)
+    ])
+    def test_interval_depends_on_status(self, status, interval):
+        import scheduler
+
+        assert scheduler.AdaptiveScheduler(jitter=0).interval_for(
+            status
+        ) == interval
+
+    def test_jitter_spreads_interval(self):
+        import scheduler
+
+        adaptive = scheduler.AdaptiveScheduler(jitter=0.1)
+        for _ in range(100):
+            assert 540 <= adaptive.interval_for(None) <= 660
+
+    def test_subscription_status(self):
+        import scheduler
+
+        assert scheduler.subscription_status([], 'approved') == 'approved'
+        assert scheduler.subscription_status([
+            {'status': 'approved', 'date_updated': '2020-02-14'},
+            {'status': 'reviewing', 'date_updated': '2020-02-13'},
+        ]) == 'reviewing'
+        assert scheduler.subscription_status([
+            {'status': 'approved', 'date_updated': '2020-02-14'},
+            {'status': 'rejected', 'date_updated': '2020-02-13'},
+        ]) == 'approved'
+
+    def test_run_polls_reviewing_subscription_more_often(self):
+        import scheduler
+        import subscriptions
+
+        clock = FakeClock()
+        adaptive = scheduler.AdaptiveScheduler(jitter=0, clock=clock)
+        reviewing = subscriptions.Subscription('token-1', '1')
+        reviewing.status = 'reviewing'
+        idle = subscriptions.Subscription('token-2', '2')
+        adaptive.add(reviewing)
+        adaptive.add(idle)
+        polled = []
+
+        def poll(subscription):
+            if clock.now > 1200:
+                raise StopPolling
+            polled.append(subscription.chat_id)
+
+        with pytest.raises(StopPolling):
+            adaptive.run(poll, sleep=clock.sleep)
+        assert polled.count('1') == 21
+        assert polled.count('2') == 3
+
+    def test_reschedule_and_remove_are_lazy(self):
+        import scheduler
+        import subscriptions
+
+        clock = FakeClock()
+        adaptive = scheduler.AdaptiveScheduler(jitter=0, clock=clock)
+        first = subscriptions.Subscription('token-1', '1')
+        second = subscriptions.Subscription('token-2', '2')
+        third = subscriptions.Subscription('token-3', '3')
+        adaptive.add(first, 10)
+        adaptive.add(second, 20)
+        adaptive.add(third, 30)
+        adaptive.add(first, 40)
+        adaptive.remove('token-2')
+
+        assert len(adaptive) == 2
+        assert adaptive.pop_due() == (third, 30)
+        assert adaptive.pop_due() == (first, 40)
+        assert adaptive.pop_due() == (None, None)
+
+    def test_tick_runs_on_empty_schedule(self):
+        import scheduler
+        from subscriptions import SubscriptionRegistry
+
+        clock = FakeClock()
+        adaptive = scheduler.AdaptiveScheduler(rate=100, clock=clock)
+        registry = SubscriptionRegistry()
+        registry.add('token-1', '1')
+        registry.add('token-2', '2')
+        ticks = []
+        polls = []
+
+        def tick():
+            ticks.append(clock.now)
+            if len(ticks) == 2:
+                for subscription in registry:
+                    adaptive.add(subscription)
+            if len(ticks) == 4:
+                raise StopPolling
+
+        try:
+            adaptive.run(polls.append, clock.sleep, tick=tick, period=5)
+        except StopPolling:
+            pass
+        assert ticks == [0, 5, 10, 15]
+        assert len(polls) == 2
+
+
+    def test_thread_pool_polls_each_subscription_in_one_thread(self):
+        import scheduler
+        from subscriptions import SubscriptionRegistry
+
+        adaptive = scheduler.AdaptiveScheduler(rate=1000, jitter=0)
+        adaptive.idle_period = 0.01
+        registry = SubscriptionRegistry()
+        for number in range(5):
+            adaptive.add(registry.add(f'token-{number}', str(number)))
+        lock = threading.Lock()
+        running = set()
+        polled = []
+        overlaps = []
+        started = time.monotonic()
+
+        def poll(subscription):
+            with lock:
+                if subscription.token in running:
+                    overlaps.append(subscription.token)
+                running.add(subscription.token)
+                polled.append(subscription.token)
+            time.sleep(0.01)
+            with lock:
+                running.discard(subscription.token)
+
+        def tick():
+            if time.monotonic() - started > 0.2:
+                raise StopPolling
+
+        with pytest.raises(StopPolling):
+            adaptive.run(poll, tick=tick, period=0.02, threads=3)
+        assert set(polled) == {f'token-{number}' for number in range(5)}
+        assert len(polled) > 10
+        assert overlaps == []
+        assert len(adaptive) == 5
+
+class TestTokenBucket:
+
+    def test_rate_is_limited(self):
+        import ratelimit
+
+        clock = FakeClock()
+        bucket = ratelimit.TokenBucket(rate=2, clock=clock)
+        assert bucket.try_acquire()
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        assert bucket.reserve() == 0.5
+        clock.sleep(1)
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
@@ -0,0 +1,118 @@
+from utils import FakeClock
+
+
+def make_registry(size):
+    from subscriptions import SubscriptionRegistry
+
+    registry = SubscriptionRegistry()
+    for number in range(size):
+        registry.add(f'token-{number}', str(number))
+    return registry
+
+
+class TestHashRing:
+
+    def test_join_moves_only_part_of_keys(self):
+        import sharding
+        from storage import subscription_key
+
+        keys = [subscription_key(f'token-{number}') for number in range(2000)]
+        before = sharding.HashRing(['a', 'b', 'c'])
+        after = sharding.HashRing(['a', 'b', 'c', 'd'])
+        moved = [
+            key for key in keys if before.node_for(key) != after.node_for(key)
+        ]
+        assert all(after.node_for(key) == 'd' for key in moved)
+        assert 0.1 * len(keys) < len(moved) < 0.4 * len(keys)
+
+    def test_empty_ring(self):
+        import sharding
+
+        assert sharding.HashRing().node_for('ff') is None
+
+
+class TestShardCoordinator:
+
+    def test_nodes_never_share_subscription(self, tmp_path):
+        import sharding
+
+        path = str(tmp_path / 'leases.db')
+        clock = FakeClock(1000.0)
+        registry = make_registry(300)
+        tokens = {subscription.token for subscription in registry}
+        first = sharding.ShardCoordinator(
+            sharding.LeaseStore(path, clock), 'first', ttl=30
+        )
+        second = sharding.ShardCoordinator(
+            sharding.LeaseStore(path, clock), 'second', ttl=30
+        )
+
+        first.rebalance(registry)
+        assert {
+            token for token in tokens if first.owns(token)
+        } == tokens
+
+        for _ in range(3):
+            for coordinator in (second, first):
+                clock.now += 5
+                coordinator.rebalance(registry)
+                assert not any(
+                    first.owns(token) and second.owns(token)
+                    for token in tokens
+                )
+        owned_by_first = {token for token in tokens if first.owns(token)}
+        owned_by_second = {token for token in tokens if second.owns(token)}
+        assert owned_by_first | owned_by_second == tokens
+        assert owned_by_first and owned_by_second
+
+        first.leave()
+        clock.now += 5
+        acquired, released = second.rebalance(registry)
+        assert {subscription.token for subscription in acquired} == (
+            owned_by_first
+        )
+        assert not released
+        assert all(second.owns(token) for token in tokens)
+
+    def test_busy_lease_is_kept_until_sent(self, tmp_path):
+        import sharding
+
+        path = str(tmp_path / 'leases.db')
+        clock = FakeClock(1000.0)
+        registry = make_registry(100)
+        first = sharding.ShardCoordinator(
+            sharding.LeaseStore(path, clock), 'first', ttl=30
+        )
+        second = sharding.ShardCoordinator(
+            sharding.LeaseStore(path, clock), 'second', ttl=30
+        )
+        first.rebalance(registry)
+        second.rebalance(registry)
+        _, released = first.rebalance(registry, busy=lambda _: True)
+        assert released
+        acquired, _ = second.rebalance(registry)
+        assert not acquired
+
+        first.rebalance(registry)
+        acquired, _ = second.rebalance(registry)
+        assert {subscription.token for subscription in acquired} == set(
+            released
+        )
+
+    def test_dead_node_lease_expires(self, tmp_path):
+        import sharding
+
+        path = str(tmp_path / 'leases.db')
+        clock = FakeClock(1000.0)
+        registry = make_registry(50)
+        first = sharding.ShardCoordinator(
+            sharding.LeaseStore(path, clock), 'first', ttl=30
+        )
+        second = sharding.ShardCoordinator(
+            sharding.LeaseStore(path, clock), 'second', ttl=30
+        )
+        first.rebalance(registry)
+        clock.now += 31
+        assert not first.owns('token-0')
+        acquired, _ = second.rebalance(registry)
+        assert len(acquired) == len(registry)
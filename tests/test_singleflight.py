@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+
+def run_concurrently(flights, function, callers):
+    from metrics import API_COALESCED
+
+    coalesced = API_COALESCED.value()
+    results = []
+    errors = []
+
+    def call():
+        try:
+            results.append(flights.do('key', function))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    while API_COALESCED.value() - coalesced < callers - 1:
+        threading.Event().wait(0.001)
+    return threads, results, errors
+
+
+class TestSingleFlight:
+
+    def test_concurrent_callers_share_one_call(self):
+        import singleflight
+
+        flights = singleflight.SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(1)
+            return {'homeworks': []}
+
+        threads, results, errors = run_concurrently(flights, fetch, 5)
+        release.set()
+        for thread in threads:
+            thread.join(1)
+
+        assert len(calls) == 1
+        assert not errors
+        assert sorted(shared for _, shared in results) == [
+            False, True, True, True, True
+        ]
+        assert all(result is results[0][0] for result, _ in results)
+        assert len(flights) == 0
+
+    def test_error_is_shared(self):
+        import singleflight
+
+        flights = singleflight.SingleFlight()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(1)
+            raise ConnectionError('нет сети')
+
+        threads, results, errors = run_concurrently(flights, fetch, 3)
+        release.set()
+        for thread in threads:
+            thread.join(1)
+
+        assert not results
+        assert len(errors) == 3
+        with pytest.raises(ValueError):
+            flights.do('key', lambda: int('x'))
+        assert flights.do('key', lambda: 1) == (1, False)
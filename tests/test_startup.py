@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+
+class TestStartup:
+
+    def test_import_does_not_load_heavy_packages(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        probe = (
+            'import sys, homework, worker, supervisor; '
+            'print(sorted(name for name in '
+            '("requests", "telegram", "dotenv") if name in sys.modules))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', probe],
+            cwd=root, capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == '[]'
+
+    def test_env_file_is_loaded_when_present(self, tmp_path, monkeypatch):
+        import homework
+
+        monkeypatch.delenv('STARTUP_PROBE', raising=False)
+        path = tmp_path / '.env'
+        path.write_text('STARTUP_PROBE=1\n')
+        homework.load_env_file(str(path))
+        assert os.environ.pop('STARTUP_PROBE') == '1'
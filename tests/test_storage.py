@@ -0,0 +1,64 @@
+import pytest
+
+
+class TestCheckpointStore:
+
+    @pytest.mark.parametrize('filename', ['state.db', 'state.jsonl'])
+    def test_state_survives_reopen(self, tmp_path, filename):
+        import storage
+
+        path = str(tmp_path / filename)
+        store = storage.open_store(path)
+        key = storage.subscription_key('sometoken')
+        store.save_cursor(key, 100)
+        store.save_cursor(key, 200)
+        store.save_status(key, '1', 'reviewing')
+        store.save_status(key, '1', 'approved')
+        store.close()
+
+        store = storage.open_store(path)
+        assert store.load_cursor(key) == 200
+        assert store.load_statuses(key) == {'1': 'approved'}
+        assert store.load_cursor('unknown') == 0
+        store.close()
+
+    def test_truncated_last_line_is_skipped(self, tmp_path):
+        import storage
+
+        path = tmp_path / 'state.jsonl'
+        path.write_text(
+            '{"key": "a", "current_date": 100}\n{"key": "a", "current_da'
+        )
+        store = storage.open_store(str(path))
+        store.save_cursor('a', 200)
+        store.close()
+
+        store = storage.open_store(str(path))
+        assert store.load_cursor('a') == 200
+        store.close()
+
+    def test_file_is_compacted(self, tmp_path):
+        import storage
+
+        path = tmp_path / 'state.jsonl'
+        store = storage.AppendOnlyFileStore(str(path), min_records=10)
+        for current_date in range(25):
+            store.save_cursor('a', current_date)
+        store.save_status('a', '1', 'approved')
+        store.close()
+
+        assert len(path.read_text().splitlines()) < 10
+        store = storage.open_store(str(path))
+        assert store.load_cursor('a') == 24
+        assert store.load_statuses('a') == {'1': 'approved'}
+        store.close()
+
+    def test_subscription_key_hides_token(self):
+        import storage
+
+        assert 'sometoken' not in storage.subscription_key('sometoken')
+
+    def test_without_path_store_is_in_memory(self):
+        import storage
+
+        assert isinstance(storage.open_store(None), storage.MemoryStore)
@@ -0,0 +1,174 @@
+import json
+import multiprocessing
+import sys
+import threading
+import time
+
+import telegram
+
+from utils import FakeClock
+
+
+def crash(*args):
+    sys.exit(3)
+
+
+class Bot:
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+
+
+class Response:
+
+    status_code = 200
+    headers = {}
+    data = {
+        'homeworks': [{
+            'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+            'date_updated': '2020-02-13T10:00:00Z',
+        }],
+        'current_date': 1600000000,
+    }
+    content = json.dumps(data).encode()
+
+    def json(self):
+        return self.data
+
+
+class Session:
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        return Response()
+
+
+def start_pool(bot, store=None):
+    import outbox
+    import supervisor
+
+    messages = outbox.Outbox(bot, rate=100, chat_rate=100, store=store)
+    messages.start()
+    pool = supervisor.Supervisor(
+        messages, None, 1, context=multiprocessing.get_context('fork')
+    )
+    pool._acks[0] = pool.context.Queue()
+    forwarder = threading.Thread(target=pool.forward, daemon=True)
+    forwarder.start()
+    remote = supervisor.RemoteOutbox(0, pool.outgoing, pool._acks[0])
+    remote.start()
+    return pool, remote, forwarder
+
+
+def stop_pool(pool, remote, forwarder):
+    pool._acks[0].put(None)
+    remote._thread.join(1)
+    pool.outgoing.put(None)
+    forwarder.join(1)
+    pool.outbox.stop(1)
+
+
+def wait_until(condition, timeout=1):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+class TestSupervisor:
+
+    def test_partitions_cover_each_subscription_once(self):
+        import supervisor
+        from subscriptions import Subscription
+
+        subscriptions = [
+            Subscription(f'token-{number}', number) for number in range(100)
+        ]
+        parts = [
+            supervisor.partition(subscriptions, index, 3)
+            for index in range(3)
+        ]
+        assert sorted(
+            subscription.token for part in parts for subscription in part
+        ) == sorted(subscription.token for subscription in subscriptions)
+        assert all(parts)
+
+    def test_worker_messages_are_sent_by_supervisor(self):
+        bot = Bot()
+        pool, remote, forwarder = start_pool(bot)
+        sent = threading.Event()
+        remote.put(1, 'text', sent.set)
+        assert sent.wait(1)
+        assert bot.sent == [(1, 'text')]
+        assert len(remote) == 0
+        stop_pool(pool, remote, forwarder)
+
+    def test_poll_through_remote_outbox(self):
+        from subscriptions import Subscription
+        from worker import Poller
+
+        bot = Bot([telegram.error.TimedOut()])
+        pool, remote, forwarder = start_pool(bot)
+        pool.outbox.backoff = 0.01
+        subscription = Subscription('tenant-token', '777')
+        poller = Poller(None, Session(), outbox=remote)
+
+        poller.poll(subscription)
+        wait_until(lambda: not subscription.pending)
+        assert len(bot.sent) == 1
+        assert 'hw1' in bot.sent[0][1]
+        stop_pool(pool, remote, forwarder)
+
+    def test_supervisor_saves_statuses_of_dead_worker(self):
+        import storage
+        from subscriptions import Subscription
+        from worker import Poller
+
+        import supervisor
+
+        store = storage.MemoryStore()
+        pool, remote, forwarder = start_pool(Bot(), store)
+        dead = supervisor.RemoteOutbox(0, pool.outgoing, pool._acks[0])
+        subscription = Subscription('tenant-token', '777')
+        Poller(None, Session(), outbox=dead).poll(subscription)
+
+        key = storage.subscription_key('tenant-token')
+        wait_until(lambda: store.load_statuses(key))
+        assert store.load_statuses(key) == {'1': 'approved'}
+        assert subscription.pending
+        stop_pool(pool, remote, forwarder)
+
+    def test_failed_ack_calls_on_failed(self):
+        bot = Bot([telegram.error.BadRequest('Chat not found')])
+        pool, remote, forwarder = start_pool(bot)
+        failed = []
+        remote.put(1, 'text', on_failed=failed.append)
+        wait_until(lambda: failed)
+        assert failed == [True]
+        assert len(remote) == 0
+        stop_pool(pool, remote, forwarder)
+
+    def test_crashed_worker_is_restarted_with_backoff(self):
+        import supervisor
+
+        clock = FakeClock()
+        pool = supervisor.Supervisor(
+            None, None, 1, target=crash,
+            context=multiprocessing.get_context('fork'), clock=clock
+        )
+        pool.start_worker(0)
+        first = pool._workers[0]
+        first.join(1)
+        assert first.exitcode == 3
+
+        pool.check()
+        assert pool._workers[0] is first
+        clock.now += supervisor.RESTART_BACKOFF
+        pool.check()
+        assert pool._workers[0] is not first
+        pool._workers[0].join(1)
@@ -0,0 +1,147 @@
+import json
+import shutil
+
+import utils
+
+
+class FakeSession:
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        return self.responses.pop(0)
+
+
+class MockResponse(utils.MockResponseGET):
+
+    def __init__(self, *args, headers=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.headers = headers or {}
+
+    @property
+    def content(self):
+        return json.dumps(self.data).encode()
+
+
+def homework_body(status, comment):
+    return {
+        'homeworks': [{
+            'id': 1,
+            'homework_name': 'student__hw01.zip',
+            'status': status,
+            'reviewer_comment': comment,
+            'date_updated': '2020-02-13T14:40:57Z',
+        }],
+        'current_date': 1581604970,
+    }
+
+
+class TestTrafficRecorder:
+
+    def test_records_sanitized_traffic(self, tmp_path, random_timestamp):
+        import traffic
+
+        path = str(tmp_path / 'traffic.jsonl.gz')
+        clock = utils.FakeClock(100.0)
+        recorder = traffic.TrafficRecorder(path, clock)
+        session = traffic.RecordingSession(FakeSession([
+            MockResponse(
+                random_timestamp=random_timestamp,
+                data=homework_body('rejected', 'Иванов, поправьте'),
+                headers={'ETag': '"v1"'}
+            )
+        ]), recorder)
+        bot = traffic.RecordingBot(utils.MockTelegramBot(), recorder)
+
+        clock.now += 1
+        session.get('url', headers={'Authorization': 'OAuth secret-token'})
+        bot.send_message('123456', 'Работа проверена')
+        recorder.close()
+
+        raw = open(path, 'rb').read()
+        assert b'secret-token' not in raw
+        _, events = traffic.load_traffic(path)
+        api, send = events
+        assert api['tenant'] == 't1' and api['t'] == 1
+        assert api['headers'] == {'ETag': '"v1"'}
+        homework = api['body']['homeworks'][0]
+        assert homework['homework_name'] == 'hw01.zip'
+        assert homework['reviewer_comment'] == 'x' * 17
+        assert homework['status'] == 'rejected'
+        assert send == {'t': 1, 'chat': 'c1', 'ms': 0, 'chars': 16}
+
+    def test_latency_excludes_lock_wait(self, tmp_path):
+        import traffic
+
+        clock = utils.FakeClock(100.0)
+        recorder = traffic.TrafficRecorder(
+            str(tmp_path / 'traffic.jsonl.gz'), clock
+        )
+
+        class SlowBot:
+            def send_message(self, chat_id, text):
+                clock.now += 0.25
+
+        class SlowLock:
+            def __enter__(self):
+                clock.now += 5
+
+            def __exit__(self, *args):
+                pass
+
+        recorder._lock = SlowLock()
+        traffic.RecordingBot(SlowBot(), recorder).send_message('1', 'text')
+        recorder._lock = traffic.threading.Lock()
+        recorder.close()
+
+        _, events = traffic.load_traffic(str(tmp_path / 'traffic.jsonl.gz'))
+        assert events[0]['ms'] == 250
+
+    def test_truncated_recording_is_readable(self, tmp_path):
+        import traffic
+
+        path = str(tmp_path / 'traffic.jsonl.gz')
+        clock = utils.FakeClock(100.0)
+        recorder = traffic.TrafficRecorder(path, clock)
+        for _ in range(3):
+            clock.now += 1
+            recorder.send('1', 'text', clock.now, 0.002)
+        shutil.copy(path, tmp_path / 'copy.gz')
+        recorder.close()
+
+        _, events = traffic.load_traffic(str(tmp_path / 'copy.gz'))
+        assert len(events) == 3
+        assert events[0]['ms'] == 2
+
+
+class TestReplay:
+
+    def test_replay_through_poller(self, tmp_path, random_timestamp):
+        import traffic
+        from subscriptions import SubscriptionRegistry
+        from worker import Poller
+
+        events = [
+            {'t': 0, 'tenant': 't1', 'ms': 1, 'status': 200,
+             'body': homework_body('reviewing', 'x')},
+            {'t': 0.5, 'tenant': 't1', 'ms': 1, 'error': 'ReadTimeout'},
+            {'t': 1, 'tenant': 't1', 'ms': 1, 'status': 200,
+             'body': homework_body('approved', 'x')},
+            {'t': 1.5, 'chat': 'c1', 'ms': 3, 'chars': 10},
+        ]
+        slept = []
+        bot = traffic.ReplayBot(events, speed=2, sleep=slept.append)
+        session = traffic.ReplaySession(events, speed=1000)
+        registry = SubscriptionRegistry()
+        registry.add('t1', 'c1')
+        poller = Poller(bot, session)
+
+        elapsed, lags, durations = traffic.replay_traffic(
+            events, lambda tenant: poller.poll(registry.get(tenant)),
+            speed=1000, concurrency=1
+        )
+
+        assert len(durations) == 3
+        assert bot.sent == 2
+        assert slept == [0.0015, 0.0015]
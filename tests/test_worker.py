@@ -0,0 +1,427 @@
+import json
+from http import HTTPStatus
+
+import pytest
+import requests
+import telegram
+
+import utils
+
+
+class MockResponse(utils.MockResponseGET):
+
+    def __init__(self, *args, headers=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.headers = headers or {}
+
+    @property
+    def content(self):
+        return json.dumps(self.data).encode()
+
+
+class TestSubscriptions:
+
+    def test_load_from_file_and_env(self, tmp_path):
+        import subscriptions
+
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps({'token-1': '1', 'token-2': '2'}))
+        registry = subscriptions.load_subscriptions(
+            str(path), token='env-token', chat_id='3'
+        )
+        assert len(registry) == 3
+        assert registry.get('token-2').chat_id == '2'
+        assert registry.get('env-token').chat_id == '3'
+
+    def test_empty_registry_raises(self):
+        import subscriptions
+        from exceptions import RequiredVariableEError
+
+        with pytest.raises(RequiredVariableEError):
+            subscriptions.load_subscriptions(None)
+
+
+class TestWorker:
+
+    def test_poll_subscription_uses_own_token_and_chat(
+            self, monkeypatch, random_timestamp, data_with_new_hw_status):
+        import subscriptions
+        import worker
+
+        calls = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            calls.append((headers, params))
+            return MockResponse(
+                random_timestamp=random_timestamp,
+                data=data_with_new_hw_status
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = utils.MockTelegramBot()
+        subscription = subscriptions.Subscription('tenant-token', '777')
+
+        worker.Poller(bot).poll(subscription)
+
+        assert calls == [(
+            {'Authorization': 'OAuth tenant-token'}, {'from_date': 0}
+        )]
+        assert bot.chat_id == '777'
+        assert 'hw123' in bot.text
+        assert subscription.from_date == random_timestamp
+
+    def test_threads_work_with_every_mode(self, monkeypatch):
+        import storage
+        import worker
+
+        store = storage.MemoryStore()
+        options = worker.parse_args(['--threads', '8', '--commands'])
+        assert worker.check_mode(options, store) is None
+        options = worker.parse_args(['--threads', '0'])
+        assert worker.check_mode(options, store)
+
+    def test_poll_does_not_repeat_notifications(
+            self, monkeypatch, random_timestamp, data_with_new_hw_status):
+        import subscriptions
+        import worker
+
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(
+                random_timestamp=random_timestamp,
+                data=data_with_new_hw_status
+            )
+        )
+        sent = []
+
+        class MockBot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        poller = worker.Poller(MockBot())
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        poller.poll(subscription)
+        poller.poll(subscription)
+        assert len(sent) == 1
+
+        data_with_new_hw_status['homeworks'][0]['status'] = 'rejected'
+        poller.poll(subscription)
+        assert len(sent) == 2
+
+    def test_poll_does_not_repeat_errors(self, monkeypatch):
+        import subscriptions
+        import worker
+
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(
+                http_status=HTTPStatus.UNAUTHORIZED, data={}
+            )
+        )
+        bot = utils.MockTelegramBot()
+        bot.is_message_sent = False
+        poller = worker.Poller(bot)
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        poller.poll(subscription)
+        assert bot.is_message_sent
+        bot.is_message_sent = False
+        poller.poll(subscription)
+        assert not bot.is_message_sent
+        assert subscription.failures == 2
+
+    def test_outage_opens_breaker_without_messages(self, monkeypatch):
+        import subscriptions
+        import worker
+
+        requests_sent = []
+
+        def mock_get(*args, **kwargs):
+            requests_sent.append(args)
+            return MockResponse(
+                http_status=HTTPStatus.INTERNAL_SERVER_ERROR, data={}
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = utils.MockTelegramBot()
+        bot.is_message_sent = False
+        poller = worker.Poller(bot)
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        for _ in range(10):
+            poller.poll(subscription)
+
+        assert len(requests_sent) == poller.breaker.threshold
+        assert poller.breaker.state == 'open'
+        assert not bot.is_message_sent
+
+    def test_poll_sends_all_updates_in_one_message(self, monkeypatch):
+        import subscriptions
+        import worker
+
+        data = {
+            'homeworks': [
+                {'id': 2, 'homework_name': 'hw2', 'status': 'approved',
+                 'date_updated': '2020-02-14T10:00:00Z'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'rejected',
+                 'date_updated': '2020-02-13T10:00:00Z'},
+            ],
+            'current_date': 1
+        }
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(data=data)
+        )
+        sent = []
+
+        class MockBot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        worker.Poller(MockBot()).poll(
+            subscriptions.Subscription('tenant-token', '777')
+        )
+        assert len(sent) == 1
+        assert sent[0].index('"hw1"') < sent[0].index('"hw2"')
+
+    def test_long_updates_are_split_by_telegram_limit(self, monkeypatch):
+        import homework
+        import subscriptions
+        import worker
+
+        data = {
+            'homeworks': [
+                {'id': number, 'homework_name': f'hw{number}' + 'x' * 900,
+                 'status': 'approved',
+                 'date_updated': f'2020-02-{number + 10}T10:00:00Z'}
+                for number in range(10)
+            ],
+            'current_date': 1
+        }
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(data=data)
+        )
+        sent = []
+
+        class MockBot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        worker.Poller(MockBot()).poll(
+            subscriptions.Subscription('tenant-token', '777')
+        )
+        assert len(sent) == 3
+        assert all(len(text) <= homework.MESSAGE_LIMIT for text in sent)
+        assert sum(text.count('Изменился') for text in sent) == 10
+
+    def test_line_longer_than_limit_is_cut(self):
+        import homework
+
+        batches = homework.pack_messages([{}, {}], ['a' * 10, 'b'], limit=4)
+        assert batches == [([{}], 'aaaa'), ([{}], 'b')]
+
+    def test_errors_do_not_contain_token(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(
+                http_status=HTTPStatus.BAD_REQUEST, data={}
+            )
+        )
+        with pytest.raises(homework.WrongStatusCodeError) as error:
+            homework.request_api('secret-token', 0)
+        assert 'secret-token' not in str(error.value)
+
+        def mock_get(*args, **kwargs):
+            raise requests.ConnectionError('Нет сети')
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        with pytest.raises(ConnectionError) as error:
+            homework.request_api('secret-token', 0)
+        assert 'secret-token' not in str(error.value)
+
+    def test_failed_send_holds_cursor(self, monkeypatch):
+        import subscriptions
+        import worker
+        from records import parse_timestamp
+
+        date_updated = '2020-02-13T10:00:00Z'
+        data = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'rejected',
+                 'date_updated': date_updated},
+            ],
+            'current_date': 1600000000
+        }
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(data=data)
+        )
+
+        class MockBot:
+            def send_message(self, chat_id, text):
+                raise ConnectionError('Telegram недоступен')
+
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        worker.Poller(MockBot()).poll(subscription)
+        assert subscription.from_date == parse_timestamp(date_updated)
+        assert subscription.pending == []
+        assert subscription.undelivered == [parse_timestamp(date_updated)]
+        assert subscription.fingerprint is None
+
+        worker.Poller(utils.MockTelegramBot()).poll(subscription)
+        assert subscription.from_date == 1600000000
+        assert subscription.undelivered == []
+
+    def test_permanent_send_failure_releases_cursor(self, monkeypatch):
+        import subscriptions
+        import worker
+
+        data = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'rejected',
+                 'date_updated': '2020-02-13T10:00:00Z'},
+            ],
+            'current_date': 1600000000
+        }
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(data=data)
+        )
+
+        class BlockedBot:
+            def send_message(self, chat_id, text):
+                raise telegram.error.Unauthorized(
+                    'Forbidden: bot was blocked by the user'
+                )
+
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        worker.Poller(BlockedBot()).poll(subscription)
+        assert subscription.from_date == 1600000000
+        assert subscription.pending == []
+        assert subscription.undelivered == []
+        assert subscription.fingerprint is not None
+
+    def test_queued_status_is_not_sent_twice(self, monkeypatch):
+        import outbox
+        import subscriptions
+        import worker
+
+        homeworks = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+             'date_updated': '2020-02-13T10:00:00Z'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing',
+             'date_updated': '2020-02-14T10:00:00Z'},
+        ]
+        responses = [
+            MockResponse(data={'homeworks': homeworks[:1], 'current_date': 1}),
+            MockResponse(data={'homeworks': homeworks, 'current_date': 2}),
+        ]
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: responses.pop(0)
+        )
+        sent = []
+
+        class MockBot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        messages = outbox.Outbox(MockBot(), rate=1000, chat_rate=1000)
+        poller = worker.Poller(None, outbox=messages)
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        poller.poll(subscription)
+        poller.poll(subscription)
+        while len(messages):
+            messages.process()
+
+        assert len(sent) == 2
+        assert '"hw1"' in sent[0] and '"hw2"' not in sent[0]
+        assert '"hw2"' in sent[1] and '"hw1"' not in sent[1]
+
+    def test_refresh_during_poll_shares_request(
+            self, monkeypatch, random_timestamp, data_with_new_hw_status):
+        import threading
+
+        import subscriptions
+        import worker
+        from metrics import API_COALESCED
+
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs.get('params'))
+            started.set()
+            release.wait(1)
+            return MockResponse(
+                random_timestamp=random_timestamp,
+                data=data_with_new_hw_status
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = utils.MockTelegramBot()
+        bot.is_message_sent = False
+        poller = worker.Poller(bot)
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        subscription.from_date = 100
+        coalesced = API_COALESCED.value()
+        scheduled = threading.Thread(target=poller.poll, args=(subscription,))
+        scheduled.start()
+        started.wait(1)
+        subscription.from_date = 0
+        refresh = threading.Thread(target=poller.poll, args=(subscription,))
+        refresh.start()
+        while API_COALESCED.value() == coalesced:
+            threading.Event().wait(0.001)
+        release.set()
+        scheduled.join(1)
+        refresh.join(1)
+
+        assert len(calls) == 1 and calls[0]['from_date'] > 0
+        assert bot.is_message_sent
+        assert len(poller.flights) == 0
+
+    def test_conditional_request_skips_decoding(self, monkeypatch):
+        import subscriptions
+        import worker
+
+        sent_headers = []
+        responses = [
+            MockResponse(
+                data={'homeworks': [], 'current_date': 1},
+                headers={'ETag': '"v1"'}
+            ),
+            MockResponse(http_status=HTTPStatus.NOT_MODIFIED, data={}),
+        ]
+
+        def mock_get(url, headers=None, params=None):
+            sent_headers.append(headers)
+            return responses.pop(0)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        poller = worker.Poller(utils.MockTelegramBot())
+        subscription = subscriptions.Subscription('tenant-token', '777')
+        poller.poll(subscription)
+        poller.poll(subscription)
+
+        assert 'If-None-Match' not in sent_headers[0]
+        assert sent_headers[1]['If-None-Match'] == '"v1"'
+        assert subscription.from_date == 1
+
+
+class TestBodyFingerprint:
+
+    def test_current_date_is_ignored(self):
+        import conditional
+
+        assert conditional.body_fingerprint(
+            b'{"homeworks": [], "current_date": 1}'
+        ) == conditional.body_fingerprint(
+            b'{"homeworks": [], "current_date": 2}'
+        )
+        assert conditional.body_fingerprint(
+            b'{"homeworks": [], "current_date": 1}'
+        ) != conditional.body_fingerprint(
+            b'{"homeworks": [{}], "current_date": 1}'
+        )
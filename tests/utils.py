@@ -165,3 +165,14 @@ def with_timeout(f):
             )
 
     return inner
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
@@ -0,0 +1,326 @@
+import atexit
+import collections
+import gzip
+import itertools
+import json
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+TRAFFIC_VERSION = 1
+FLUSH_PERIOD = 1
+KEPT_FIELDS = ('id', 'status', 'date_updated', 'lesson_name')
+KEPT_HEADERS = ('ETag', 'Last-Modified')
+
+
+def sanitize_homework(homework):
+    """Верни работу без персональных данных.
+
+    Из названия убирается логин студента, а текст остальных полей
+    (комментарий ревьюера и т. п.) заменяется строкой той же длины,
+    чтобы размер ответа и стоимость его разбора не менялись.
+    """
+    if not isinstance(homework, dict):
+        return homework
+    sanitized = {}
+    for field, value in homework.items():
+        if field == 'homework_name' and isinstance(value, str):
+            value = value.rsplit('__', 1)[-1]
+        elif field not in KEPT_FIELDS and isinstance(value, str):
+            value = 'x' * len(value)
+        sanitized[field] = value
+    return sanitized
+
+
+def sanitize_body(body):
+    """Верни ответ API со списком работ без персональных данных."""
+    if isinstance(body, dict) and isinstance(body.get('homeworks'), list):
+        return dict(
+            body, homeworks=[
+                sanitize_homework(homework) for homework in body['homeworks']
+            ]
+        )
+    return body
+
+
+class TrafficRecorder:
+    """Запись запросов к API и отправок в Telegram в сжатый файл.
+
+    Файл — JSON-строки в gzip. Токены и чаты заменяются порядковыми
+    псевдонимами t1, t2, ... и c1, c2, ..., тексты сообщений не
+    сохраняются, из ответов API убираются персональные данные.
+    Раз в FLUSH_PERIOD секунд файл сбрасывается на диск, поэтому
+    запись, оборванную остановкой процесса, можно прочитать.
+    """
+
+    def __init__(self, path, clock=time.monotonic):
+        """Открой файл и запиши заголовок."""
+        self.clock = clock
+        self._file = gzip.open(path, 'wt', encoding='UTF-8')
+        self._lock = threading.Lock()
+        self._aliases = {'t': {}, 'c': {}}
+        self._started = clock()
+        self._flushed = self._started
+        self._write({'version': TRAFFIC_VERSION, 'started': time.time()})
+
+    def _alias(self, kind, value):
+        aliases = self._aliases[kind]
+        alias = aliases.get(value)
+        if alias is None:
+            alias = aliases[value] = f'{kind}{len(aliases) + 1}'
+        return alias
+
+    def _write(self, event):
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+        self._file.write(line + '\n')
+        now = self.clock()
+        if now - self._flushed >= FLUSH_PERIOD:
+            self._file.flush()
+            self._flushed = now
+
+    def _event(self, kind, value, started, elapsed):
+        return {
+            't': round(started - self._started, 3),
+            kind: self._alias(kind[0], value),
+            'ms': round(elapsed * 1000, 1),
+        }
+
+    def api(self, token, started, elapsed, response=None, error=None):
+        """Запиши запрос к API и его ответ или ошибку.
+
+        started — момент начала запроса по clock, elapsed — его
+        длительность в секундах, замеренная до ожидания блокировки.
+        """
+        with self._lock:
+            event = self._event('tenant', token, started, elapsed)
+            if error is not None:
+                event['error'] = type(error).__name__
+            else:
+                event['status'] = response.status_code
+                headers = {
+                    name: response.headers.get(name) for name in KEPT_HEADERS
+                    if response.headers.get(name)
+                }
+                if headers:
+                    event['headers'] = headers
+                try:
+                    event['body'] = sanitize_body(response.json())
+                except ValueError:
+                    event['body'] = None
+            self._write(event)
+
+    def send(self, chat_id, text, started, elapsed, error=None):
+        """Запиши отправку сообщения: чат, длину текста и ошибку."""
+        with self._lock:
+            event = self._event('chat', chat_id, started, elapsed)
+            event['chars'] = len(text)
+            if error is not None:
+                event['error'] = type(error).__name__
+            self._write(event)
+
+    def close(self):
+        """Допиши и закрой файл."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class RecordingSession:
+    """Сессия requests, которая записывает запросы к API."""
+
+    def __init__(self, session, recorder):
+        """Запомни сессию (None — модуль requests) и запись."""
+        self.session = session
+        self.recorder = recorder
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """Сделай запрос и запиши его ответ или ошибку."""
+        import requests
+
+        client = requests if self.session is None else self.session
+        token = (headers or {}).get('Authorization', '').split()[-1:]
+        clock = self.recorder.clock
+        started = clock()
+        try:
+            response = client.get(
+                url, headers=headers, params=params, **kwargs
+            )
+        except Exception as error:
+            self.recorder.api(
+                ''.join(token), started, clock() - started, error=error
+            )
+            raise
+        self.recorder.api(''.join(token), started, clock() - started, response)
+        return response
+
+    def __getattr__(self, name):
+        """Остальное бери у исходной сессии."""
+        return getattr(self.session, name)
+
+
+class RecordingBot:
+    """Бот, который записывает отправленные сообщения."""
+
+    def __init__(self, bot, recorder):
+        """Запомни бота и запись."""
+        self.bot = bot
+        self.recorder = recorder
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        """Отправь сообщение и запиши отправку."""
+        clock = self.recorder.clock
+        started = clock()
+        try:
+            result = self.bot.send_message(chat_id, text, *args, **kwargs)
+        except Exception as error:
+            self.recorder.send(
+                chat_id, text, started, clock() - started, error
+            )
+            raise
+        self.recorder.send(chat_id, text, started, clock() - started)
+        return result
+
+    def __getattr__(self, name):
+        """Остальное бери у исходного бота."""
+        return getattr(self.bot, name)
+
+
+def record_traffic(path, bot, session):
+    """Оберни бота и сессию записью в path; без path верни их как есть."""
+    if not path:
+        return bot, session
+    recorder = TrafficRecorder(path)
+    atexit.register(recorder.close)
+    return RecordingBot(bot, recorder), RecordingSession(session, recorder)
+
+
+def load_traffic(path):
+    """Прочитай запись, верни заголовок и события по времени.
+
+    Оборванный конец файла (процесс остановлен во время записи)
+    пропускается.
+    """
+    with open(path, 'rb') as file:
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(file.read())
+    events = []
+    for line in data.decode('UTF-8', 'ignore').splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            break
+    if not events or events[0].get('version') != TRAFFIC_VERSION:
+        raise ValueError(f'Файл {path} не похож на запись трафика бота.')
+    header, events = events[0], events[1:]
+    events.sort(key=lambda event: event['t'])
+    return header, events
+
+
+class ReplayResponse:
+    """Записанный ответ API в виде ответа requests."""
+
+    __slots__ = ('status_code', 'headers', 'content', '_body')
+
+    def __init__(self, event):
+        """Собери ответ из события записи."""
+        self.status_code = event['status']
+        self.headers = event.get('headers', {})
+        self._body = event.get('body')
+        self.content = (
+            b'' if self._body is None else json.dumps(self._body).encode()
+        )
+
+    def json(self):
+        """Верни тело ответа."""
+        if self._body is None:
+            raise ValueError('Тело ответа не в формате JSON.')
+        return json.loads(self.content)
+
+
+class ReplaySession:
+    """Отдает записанные ответы API по порядку для каждой подписки.
+
+    Задержка ответа — записанная, деленная на speed. Когда записанные
+    ответы подписки кончились, повторяется последний.
+    """
+
+    def __init__(self, events, speed=1, sleep=time.sleep):
+        """Разложи ответы API из записи по подпискам."""
+        self.speed = speed
+        self.sleep = sleep
+        self._responses = collections.defaultdict(collections.deque)
+        for event in events:
+            if 'tenant' in event:
+                response = None
+                if 'error' not in event:
+                    response = ReplayResponse(event)
+                self._responses[event['tenant']].append(
+                    (event['ms'], response)
+                )
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """Верни следующий записанный ответ подписки из заголовка."""
+        import requests
+
+        tenant = headers['Authorization'].split()[-1]
+        responses = self._responses[tenant]
+        milliseconds, response = (
+            responses.popleft() if len(responses) > 1 else responses[0]
+        )
+        self.sleep(milliseconds / 1000 / self.speed)
+        if response is None:
+            raise requests.ConnectionError('Записанная ошибка сети.')
+        return response
+
+
+class ReplayBot:
+    """Заменитель бота с записанными задержками отправки."""
+
+    def __init__(self, events, speed=1, sleep=time.sleep):
+        """Возьми задержки отправок из записи."""
+        self.speed = speed
+        self.sleep = sleep
+        self.sent = 0
+        self._lock = threading.Lock()
+        self._delays = itertools.cycle([
+            event['ms'] for event in events if 'chat' in event
+        ] or [0])
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        """Подожди записанную задержку и посчитай сообщение."""
+        with self._lock:
+            milliseconds = next(self._delays)
+        self.sleep(milliseconds / 1000 / self.speed)
+        with self._lock:
+            self.sent += 1
+
+
+def replay_traffic(events, poll, speed=1, concurrency=32,
+                   clock=time.monotonic, sleep=time.sleep):
+    """Опрашивай подписки в записанные моменты, ускоренные в speed раз.
+
+    poll(tenant) выполняется в пуле из concurrency потоков, поэтому
+    медленный опрос не сдвигает остальные. Верни длительность прогона,
+    задержки старта опросов относительно расписания и время опросов.
+    """
+    lags = []
+    durations = []
+
+    def timed_poll(tenant, due):
+        started = clock()
+        lags.append(max(started - due, 0))
+        poll(tenant)
+        durations.append(clock() - started)
+
+    started = clock()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for event in events:
+            if 'tenant' not in event:
+                continue
+            due = started + event['t'] / speed
+            delay = due - clock()
+            if delay > 0:
+                sleep(delay)
+            executor.submit(timed_poll, event['tenant'], due)
+    return clock() - started, lags, durations
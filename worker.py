@@ -0,0 +1,441 @@
+import argparse
+import logging
+import os
+import sys
+
+from breaker import CircuitBreaker
+from cache import StatusCache
+from commands import COMMANDS_PERIOD, BotCommands, start_commands
+from config import CONFIG_CHECK_PERIOD, ConfigReloader, load_config
+from conditional import (
+    conditional_headers,
+    forget_validators,
+    is_unchanged
+)
+from connection_pool import (
+    POOL_MAXSIZE,
+    create_session,
+    export_pool_stats
+)
+from cursor import advance_cursor, hold_cursor, request_from_date
+from decoding import decode, validate_response
+from exceptions import (
+    RequiredVariableEError,
+    TemporaryAPIError,
+    WrongStatusCodeError
+)
+from homework import (
+    TELEGRAM_TOKEN,
+    collect_updates,
+    request_api
+)
+from logs import setup_logging
+from metrics import (
+    API_LATENCY,
+    API_RESPONSES,
+    METRICS_PORT,
+    OUTBOX_DEPTH,
+    PARSE_FAILURES,
+    TELEGRAM_ERRORS,
+    TELEGRAM_LATENCY,
+    start_metrics_server
+)
+from outbox import Outbox, is_permanent
+from profiler import SamplingProfiler, stages
+from records import parse_timestamp
+from scheduler import AdaptiveScheduler, stagger, subscription_status
+from sharding import SHARD_STORE, LeaseStore, ShardCoordinator
+from singleflight import SingleFlight
+from storage import SQLiteStore, homework_key, open_store, subscription_key
+from subscriptions import load_subscriptions
+from traffic import record_traffic
+
+
+POLL_THREADS = int(os.getenv('POLL_THREADS', 1))
+
+logger = logging.getLogger('worker')
+
+
+class Poller:
+    """Опрос подписок с общими ботом, сессией, хранилищем и кэшем."""
+
+    def __init__(self, bot, session=None, store=None, cache=None,
+                 outbox=None, breaker=None):
+        """Запомни общие для всех подписок ресурсы.
+
+        Если передана очередь outbox, сообщения отправляются через нее,
+        иначе — сразу из потока опроса.
+        """
+        self.bot = bot
+        self.session = session
+        self.store = open_store(None) if store is None else store
+        self.cache = StatusCache(store=self.store) if cache is None else cache
+        self.outbox = outbox
+        self.breaker = CircuitBreaker() if breaker is None else breaker
+        self.flights = SingleFlight()
+        self.validate = validate_response
+
+    def restore_checkpoints(self, subscriptions):
+        """Восстанови курсоры подписок из хранилища.
+
+        Кэш статусов и условные заголовки подписок сбрасываются: до этого
+        подписку мог опрашивать другой узел.
+        """
+        keys = []
+        for subscription in subscriptions:
+            key = subscription_key(subscription.token)
+            keys.append(key)
+            subscription.from_date = self.store.load_cursor(key)
+            forget_validators(subscription)
+        self.cache.forget_subscriptions(keys)
+
+    def send(self, subscription, message, on_sent, on_failed=None,
+             checkpoint=None):
+        """Отправь сообщение в чат подписки.
+
+        После успеха вызови on_sent, после окончательного отказа —
+        on_failed(permanent), где permanent истинно, если повтор
+        не поможет. checkpoint — статусы сообщения для очереди,
+        которая сама сохраняет их после отправки.
+        """
+        if self.outbox is not None:
+            self.outbox.put(
+                subscription.chat_id, message, on_sent, on_failed,
+                checkpoint=checkpoint
+            )
+            return
+        try:
+            with TELEGRAM_LATENCY.time(), stages.time('send_message'):
+                self.bot.send_message(subscription.chat_id, message)
+        except Exception as error:
+            TELEGRAM_ERRORS.inc(error=type(error).__name__)
+            logger.exception(
+                'Ошибка отправки сообщения в чат подписки. %s', error,
+                extra={'tenant': subscription_key(subscription.token)}
+            )
+            if on_failed is not None:
+                on_failed(is_permanent(error))
+            return
+        on_sent()
+
+    def notify(self, subscription, homeworks):
+        """Отправь новые статусы работ в чат подписки.
+
+        Статусы склеиваются в сообщения не длиннее лимита Telegram.
+        Новые сообщения несут и недоставленные раньше статусы, поэтому
+        заменяют их в undelivered.
+        """
+        key = subscription_key(subscription.token)
+        batches = collect_updates(homeworks, self.cache, key)
+        if not batches:
+            logger.debug(
+                'Статусы домашних работ не изменились.',
+                extra={'tenant': key}
+            )
+            return
+        subscription.undelivered.clear()
+        for updates, message in batches:
+            self.send_updates(subscription, key, updates, message)
+
+    def send_updates(self, subscription, key, updates, message):
+        """Отправь сообщение о новых статусах работ updates.
+
+        Пока сообщение не доставлено, курсор подписки держится на
+        date_updated самой ранней из этих работ: если отправка не
+        удастся, следующий опрос снова получит их и повторит сообщение.
+        Для этого после неудачи забываются и валидаторы ответа: иначе
+        тот же ответ был бы пропущен как неизменившийся. Если Telegram
+        отклонил сообщение насовсем (бот заблокирован, чат не найден),
+        повтор не поможет: курсор отпускается, а отказ пишется в журнал.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Новые статусы: %s', message, extra={
+                'tenant': key,
+                'homework': [homework_key(homework) for homework in updates]
+            })
+
+        hold = min(
+            parse_timestamp(homework.get('date_updated'))
+            for homework in updates
+        )
+        subscription.pending.append(hold)
+
+        def remember_statuses():
+            for homework in updates:
+                self.cache.remember_status(key, homework)
+            self.cache.finish_sending(key, updates)
+            subscription.pending.remove(hold)
+
+        def keep_cursor(permanent):
+            self.cache.finish_sending(key, updates)
+            subscription.pending.remove(hold)
+            if permanent:
+                logger.error(
+                    'Telegram не принимает сообщения в чат подписки, '
+                    'новые статусы пропущены.', extra={'tenant': key}
+                )
+                return
+            subscription.undelivered.append(hold)
+            forget_validators(subscription)
+            logger.warning(
+                'Сообщение о новых статусах не доставлено, повторю '
+                'при следующем опросе.', extra={'tenant': key}
+            )
+
+        self.cache.start_sending(key, updates)
+        self.send(
+            subscription, message, remember_statuses, keep_cursor,
+            checkpoint=(key, [
+                (homework_key(homework), homework.get('status'))
+                for homework in updates
+            ])
+        )
+
+    def report_error(self, subscription, message):
+        """Отправь ошибку в чат подписки, если она не повторяет прошлую."""
+        key = subscription_key(subscription.token)
+        if self.cache.is_new_error(key, message):
+            self.send(
+                subscription, message,
+                lambda: self.cache.remember_error(key, message)
+            )
+
+    def fetch(self, subscription):
+        """Запроси статусы подписки, верни ответ API или None при сбое.
+
+        Временные сбои API (429, 5xx, ошибки сети) учитываются
+        предохранителем и в чат не отправляются. Отказ в доступе
+        касается только этой подписки и сообщается в ее чат.
+        """
+        context = {'tenant': subscription_key(subscription.token)}
+        if not self.breaker.allow():
+            logger.debug(
+                'API недоступен, опрос подписки пропущен.', extra=context
+            )
+            return None
+        try:
+            with API_LATENCY.time():
+                response = request_api(
+                    subscription.token,
+                    request_from_date(subscription.from_date), self.session,
+                    conditional_headers(subscription)
+                )
+        except (TemporaryAPIError, ConnectionError) as error:
+            API_RESPONSES.inc(status=type(error).__name__)
+            self.breaker.record_failure()
+            subscription.failures += 1
+            logger.warning(
+                'API временно недоступен: %s', error, extra=context
+            )
+            return None
+        except WrongStatusCodeError as error:
+            API_RESPONSES.inc(status=type(error).__name__)
+            self.breaker.record_success()
+            subscription.failures += 1
+            message = f'Сбой в работе программы: {error}'
+            logger.error(message, extra=context)
+            self.report_error(subscription, message)
+            return None
+        API_RESPONSES.inc(status=int(response.status_code))
+        self.breaker.record_success()
+        subscription.failures = 0
+        return response
+
+    def poll(self, subscription):
+        """Запроси статусы одной подписки и отправь изменения в ее чат.
+
+        Если ответ не изменился с прошлого опроса, он не декодируется
+        и не проверяется. Если подписку уже опрашивает другой поток
+        (например, /refresh поставил ее в расписание во время планового
+        опроса), вызов дожидается его запроса и ничего не обрабатывает
+        повторно: ответ обрабатывает только первый опрос.
+        """
+        key = subscription_key(subscription.token)
+        raw_response, shared = self.flights.do(
+            key, lambda: self.fetch(subscription)
+        )
+        if raw_response is None or shared:
+            return
+        if is_unchanged(subscription, raw_response):
+            logger.debug('Ответ API не изменился.', extra={'tenant': key})
+            return
+        try:
+            with stages.time('response.json'):
+                response = decode(raw_response.content)
+            with stages.time('check_response'):
+                homeworks = self.validate(response)
+            if not homeworks:
+                logger.debug(
+                    'Список домашних работ пуст.', extra={'tenant': key}
+                )
+            else:
+                self.cache.observe(key, homeworks)
+                self.notify(subscription, homeworks)
+            subscription.status = subscription_status(
+                homeworks, subscription.status
+            )
+            self.cache.forget_error(key)
+        except Exception as error:
+            PARSE_FAILURES.inc()
+            subscription.fingerprint = None
+            message = f'Сбой в работе программы: {error}'
+            logger.exception(message, extra={'tenant': key})
+            self.report_error(subscription, message)
+        else:
+            subscription.from_date = hold_cursor(
+                advance_cursor(subscription.from_date, response),
+                subscription.pending + subscription.undelivered
+            )
+            self.store.save_cursor(key, subscription.from_date)
+
+
+def run_sharded(poller, registry, scheduler, coordinator, threads=1):
+    """Опрашивай только подписки, аренды которых держит этот узел.
+
+    Раз в coordinator.heartbeat секунд между опросами узел сверяет
+    аренды: отданные подписки убираются из расписания (аренда
+    отпускается, когда в очереди не останется их сообщений), взятые
+    загружают курсор из общего хранилища и ставятся в расписание.
+    """
+    def busy(subscription):
+        return poller.outbox is not None and poller.outbox.has_pending(
+            subscription.chat_id
+        )
+
+    def rebalance():
+        acquired, released = coordinator.rebalance(registry, busy)
+        for token in released:
+            scheduler.remove(token)
+        poller.restore_checkpoints(acquired)
+        stagger(scheduler, acquired, coordinator.heartbeat)
+        if acquired or released:
+            logger.info(
+                'Узел %s: взято подписок %d, отдано %d, всего %d.',
+                coordinator.node, len(acquired), len(released),
+                len(scheduler)
+            )
+
+    def poll(subscription):
+        if coordinator.owns(subscription.token):
+            poller.poll(subscription)
+
+    try:
+        scheduler.run(
+            poll, tick=rebalance, period=coordinator.heartbeat,
+            threads=threads
+        )
+    finally:
+        coordinator.leave()
+
+
+def run_commands(poller, registry, scheduler, reloader, profiler=None,
+                 threads=1):
+    """Опрашивай подписки и отвечай на команды бота.
+
+    Накопленные команды и проверка настроек выполняются в потоке
+    опроса между опросами.
+    """
+    commands = BotCommands(registry, poller.cache, profiler=profiler)
+    updater = start_commands(commands, TELEGRAM_TOKEN)
+
+    def tick():
+        commands.apply(scheduler, poller)
+        reloader.check()
+
+    try:
+        scheduler.run(
+            poller.poll, tick=tick, period=COMMANDS_PERIOD, threads=threads
+        )
+    finally:
+        updater.stop()
+
+
+def check_mode(options, store):
+    """Верни описание несовместимых настроек или None."""
+    if options.threads < 1:
+        return 'Число потоков опроса --threads должно быть не меньше 1.'
+    if SHARD_STORE and not isinstance(store, SQLiteStore):
+        return 'Для шардирования нужен общий STATE_STORE в базе SQLite.'
+    if options.commands and SHARD_STORE:
+        return 'Команды бота работают только в одном процессе без SHARD_STORE.'
+    return None
+
+
+def parse_args(args=None):
+    """Разбери аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        '--commands', action='store_true',
+        help='отвечать на команды /status, /history, /refresh, /subscribe'
+    )
+    parser.add_argument(
+        '--threads', type=int, default=POLL_THREADS,
+        help='число потоков опроса (одновременных запросов к API)'
+    )
+    parser.add_argument(
+        '--record', metavar='PATH',
+        help='записывать запросы к API и отправки в Telegram в файл'
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Опрашивай все подписки одним процессом."""
+    import telegram
+
+    options = parse_args(args)
+    try:
+        if not TELEGRAM_TOKEN:
+            raise RequiredVariableEError(
+                'Отсутствует обязательная переменная TELEGRAM_TOKEN.'
+            )
+        config = load_config()
+        registry = load_subscriptions(
+            token=config.practicum_token, chat_id=config.telegram_chat_id
+        )
+    except (RequiredVariableEError, OSError, ValueError, TypeError) as error:
+        logger.critical(error)
+        sys.exit(error)
+    store = open_store()
+    message = check_mode(options, store)
+    if message:
+        logger.critical(message)
+        sys.exit(message)
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    session = create_session(pool_maxsize=max(options.threads, POOL_MAXSIZE))
+    export_pool_stats(session)
+    bot, session = record_traffic(options.record, bot, session)
+    outbox = Outbox(bot)
+    outbox.start()
+    OUTBOX_DEPTH.set_function(lambda: len(outbox))
+    if METRICS_PORT:
+        start_metrics_server()
+    poller = Poller(bot, session, store, outbox=outbox)
+    scheduler = AdaptiveScheduler()
+    reloader = ConfigReloader(registry, scheduler, poller)
+    reloader.apply(config, registry)
+    profiler = SamplingProfiler()
+    profiler.watch_signal()
+    if SHARD_STORE:
+        run_sharded(
+            poller, registry, scheduler,
+            ShardCoordinator(LeaseStore(SHARD_STORE)), options.threads
+        )
+        return
+    poller.restore_checkpoints(registry)
+    stagger(scheduler, registry)
+    reloader.watch_signal()
+    if not options.commands:
+        scheduler.run(
+            poller.poll, tick=reloader.check, period=CONFIG_CHECK_PERIOD,
+            threads=options.threads
+        )
+        return
+    run_commands(
+        poller, registry, scheduler, reloader, profiler, options.threads
+    )
+
+
+if __name__ == '__main__':
+    setup_logging(__file__ + '.log')
+    main()